@@ -0,0 +1,48 @@
+import argparse
+import sys
+
+from cad_models.cli import create_parser
+from cad_models.registry import get_model_info, get_models, load_model
+
+
+def print_models():
+    for info in get_models().values():
+        print(f"{info.name}: {', '.join(info.variants)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m cad_models",
+        usage="%(prog)s {list,MODEL} [VARIANT] [options]",
+        epilog="run '%(prog)s MODEL --help' for build options",
+    )
+    parser.add_argument("model", help=f"'list', or one of: {', '.join(get_models())}")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.model == "list":
+        print_models()
+        return
+
+    try:
+        info = get_model_info(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # a leading positional selects the variant
+    build_args = args.args
+    if build_args and not build_args[0].startswith("-"):
+        build_args = ["--variant", *build_args]
+
+    # OCCT is only loaded once a model has been chosen and its options parse - so
+    # that --help and usage errors are immediate
+    prog = f"python -m cad_models {info.name}"
+    create_parser(prog, info.variants, info.parts).parse_args(build_args)
+    from cad_models.jobs import main as build_main
+
+    model = load_model(info.name)
+    build_main(model.build_part_fns, model.variants, args=build_args, prog=prog)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+from dataclasses import dataclass
+
+from build123d import Mesher
+
+from cad_models.cache import bypass_caches
+from cad_models.common import Model, clear_caches
+from cad_models.export import export_shapes
+from cad_models.keys import get_dependency_fingerprint
+from cad_models.parts import build_variant
+from cad_models.registry import get_models, load_model
+from cad_models.timings import print_table
+
+metrics = ["build", "tessellate", "export_step", "export_3mf"]
+
+
+@dataclass
+class BenchmarkArgs:
+    compare: pathlib.Path | None
+    min_delta: float
+    model: list[str] | None
+    output: pathlib.Path | None
+    repeat: int
+    startup_budget: float | None
+    threshold: float
+    warmup: int
+
+
+def discover_models() -> dict[str, Model]:
+    return {name: load_model(name) for name in get_models()}
+
+
+def measure(model: Model, parameters: typing.Any, folder: pathlib.Path) -> dict:
+    # in-process caches are cleared and disk caches bypassed, so that every run
+    # measures a full build - assets, hole tools and hex grids included
+    clear_caches()
+    times = {}
+
+    with bypass_caches():
+        start = time.perf_counter()
+        packed = build_variant(model.build_part_fns, parameters, cache=False)
+        times["build"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mesher = Mesher()
+        mesher.add_shape(packed)
+        times["tessellate"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        export_shapes(packed, folder.joinpath("benchmark.step"))
+        times["export_step"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mesher.write(folder.joinpath("benchmark.3mf"))
+        times["export_3mf"] = time.perf_counter() - start
+
+    return times
+
+
+def measure_startup() -> tuple[float, bool]:
+    # a fresh interpreter, as a headless export job starts - the viewer must not load
+    code = "import sys, cad_models.common; print('ocp_vscode' in sys.modules)"
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    duration = time.perf_counter() - start
+    return duration, process.stdout.strip() == "True"
+
+
+def summarize(values: list[float]) -> dict:
+    return {"median": statistics.median(values), "runs": values}
+
+
+def run(args: BenchmarkArgs) -> dict:
+    models = discover_models()
+    names = args.model or list(models.keys())
+    for name in names:
+        if name not in models:
+            raise ValueError(f"invalid model: {name}")
+
+    results = {}
+    startups = [measure_startup() for _ in range(args.repeat)]
+    results["startup"] = {"import": summarize([duration for duration, _ in startups])}
+    viewer_imported = any(viewer for _, viewer in startups)
+    print(
+        f"startup: import={results['startup']['import']['median']:.3f}s",
+        file=sys.stderr,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_folder:
+        folder = pathlib.Path(temp_folder)
+        for name in names:
+            model = models[name]
+            for variant, parameters in model.variants.items():
+                for _ in range(args.warmup):
+                    measure(model, parameters, folder)
+                runs = [measure(model, parameters, folder) for _ in range(args.repeat)]
+                result = {}
+                for metric in metrics:
+                    result[metric] = summarize([run[metric] for run in runs])
+                results[f"{name}:{variant}"] = result
+                medians = ", ".join(
+                    f"{metric}={result[metric]['median']:.3f}s" for metric in metrics
+                )
+                print(f"{name}:{variant}: {medians}", file=sys.stderr)
+
+    return {
+        "environment": {
+            "dependencies": get_dependency_fingerprint(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+        "viewer_imported": viewer_imported,
+    }
+
+
+def compare(
+    baseline: dict, current: dict, threshold: float, min_delta: float
+) -> list[str]:
+    rows = [("benchmark", "metric", "baseline", "current", "change", "")]
+    regressions = []
+    for key, result in current["results"].items():
+        baseline_result = baseline["results"].get(key)
+        if not baseline_result:
+            continue
+        for metric in result:
+            if metric not in baseline_result:
+                continue
+            before = baseline_result[metric]["median"]
+            after = result[metric]["median"]
+            change = (after - before) / before if before else 0.0
+            regressed = after - before > min_delta and change > threshold
+            if regressed:
+                regressions.append(f"{key} {metric}")
+            row = (
+                key,
+                metric,
+                f"{before:.3f}s",
+                f"{after:.3f}s",
+                f"{change:+.1%}",
+                "REGRESSION" if regressed else "",
+            )
+            rows.append(row)
+    print_table(rows, left_columns=2)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m cad_models.benchmark")
+    parser.add_argument("--compare", type=pathlib.Path, default=None)
+    parser.add_argument("--min-delta", type=float, default=0.05)
+    parser.add_argument("--model", action="append", default=None)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        default=None,
+        help="fail if importing cad_models.common takes longer, in seconds",
+    )
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--warmup", type=int, default=1)
+    args = BenchmarkArgs(**vars(parser.parse_args()))
+
+    current = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    regressions = []
+    if current["viewer_imported"]:
+        regressions.append("startup imports ocp_vscode")
+    startup = current["results"]["startup"]["import"]["median"]
+    if args.startup_budget is not None and startup > args.startup_budget:
+        regressions.append(f"startup import {startup:.3f}s > {args.startup_budget}s")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions += compare(baseline, current, args.threshold, args.min_delta)
+    if regressions:
+        raise SystemExit(f"regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
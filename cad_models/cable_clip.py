@@ -1,6 +1,7 @@
 from bd_warehouse.fastener import *
 from build123d import *
-from common import *
+
+from cad_models.common import *
 
 ethernet_cable_thickness = 6.5 * MM
 
@@ -18,10 +19,9 @@ class Parameters:
     two_sided: bool = False
 
 
-def builder_fn(p: Parameters):
+def build_clip(p: Parameters) -> Part:
     with BuildPart() as builder:
-        # clip
-        with BuildSketch(Plane.YZ) as sketch:
+        with BuildSketch(Plane.YZ):
             outer_width = p.clip_height + (p.clip_thickness * 2)
             outer_height = p.clip_depth + p.clip_thickness
             Rectangle(outer_width, outer_height, align=(Align.CENTER, Align.MIN))
@@ -35,37 +35,62 @@ def builder_fn(p: Parameters):
             location *= Pos(X=-outer_width / 2)
             with Locations(location):
                 shape = Rectangle(
-                    p.clip_tab_height, p.clip_thickness, align=(Align.MAX, Align.MIN)
+                    p.clip_tab_height,
+                    p.clip_thickness,
+                    align=(Align.MAX, Align.MIN),
                 )
             if p.two_sided:
                 mirror(shape, about=Plane.YZ)
         extrude(amount=p.clip_width)
+    return require(builder.part)
 
-        # screw holes
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-3]
+
+def cut_screw_holes(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Z)[-3]
         with Locations(Plane(face, x_dir=(0, -1, 0))):
-            obj = CounterSinkHole(
+            hole = counter_sink_hole(
                 p.screw_diameter / 2, p.screw_head_diameter / 2, p.clip_thickness
             )
+            obj = add(hole, mode=Mode.SUBTRACT)
         if p.two_sided:
             mirror(obj, about=Plane.XZ, mode=Mode.SUBTRACT)
+    return require(builder.part)
 
-        # fillet
+
+def fillet_clip(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
         edges = []
-        some_edges = builder.edges().filter_by(Axis.X).sort_by(Axis.Z)[-4:]
+        some_edges = select_edges(builder, Axis.X, Axis.Z)[-4:]
         edges += some_edges
-        some_edges = builder.edges().filter_by(Axis.Z).sort_by(Axis.Y)[:2]
+        some_edges = select_edges(builder, Axis.Z, Axis.Y)[:2]
         edges += some_edges
         if p.two_sided:
-            some_edges = builder.edges().filter_by(Axis.Z).sort_by(Axis.Y)[-2:]
+            some_edges = select_edges(builder, Axis.Z, Axis.Y)[-2:]
             edges += some_edges
         fillet(edges, radius=p.fillet_radius)
+    return require(builder.part)
+
+
+def builder_fn(p: Parameters):
+    with BuildPart() as builder:
+        with stage("clip", builder) as s:
+            s.checkpoint(build_clip, p)
+
+        with stage("screw holes", builder) as s:
+            s.checkpoint(cut_screw_holes, p)
+
+        if not is_draft():
+            with stage("fillet", builder) as s:
+                s.checkpoint(fillet_clip, p)
 
     return builder
 
 
-main(
-    builder_fn,
+model = Model(
+    [builder_fn],
     {
         "1-cable": Parameters(clip_height=1 * ethernet_cable_thickness),
         "2-cable": Parameters(clip_height=2 * ethernet_cable_thickness),
@@ -73,3 +98,7 @@ main(
         "4-cable": Parameters(clip_height=4 * ethernet_cable_thickness),
     },
 )
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
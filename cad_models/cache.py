@@ -0,0 +1,141 @@
+import contextlib
+import hashlib
+import os
+import pathlib
+import tempfile
+import typing
+
+if typing.TYPE_CHECKING:
+    from build123d import Shape
+
+
+def get_cache_folder() -> pathlib.Path:
+    folder = os.environ.get("CAD_MODELS_CACHE_DIR")
+    if folder:
+        return pathlib.Path(folder)
+    folder = os.environ.get("XDG_CACHE_HOME")
+    if folder:
+        return pathlib.Path(folder).joinpath("cad-models")
+    return pathlib.Path.home().joinpath(".cache", "cad-models")
+
+
+def hash_bytes(*values: bytes) -> str:
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(len(value).to_bytes(8, "little"))
+        digest.update(value)
+    return digest.hexdigest()
+
+
+def hash_file(path: pathlib.Path) -> str:
+    return hash_bytes(path.read_bytes())
+
+
+# cleared by bypass_caches() - e.g. under --no-cache every cache misses and nothing
+# is stored
+enabled = True
+
+
+@contextlib.contextmanager
+def bypass_caches() -> typing.Iterator[None]:
+    global enabled
+    previous = enabled
+    enabled = False
+    try:
+        yield
+    finally:
+        enabled = previous
+
+
+# OCCT is imported lazily so that callers which only need paths or hashes stay fast
+
+
+def read_brep(path: pathlib.Path) -> "Shape":
+    from build123d import Compound
+    from OCP.BinTools import BinTools
+    from OCP.TopoDS import TopoDS_Shape
+
+    shape = TopoDS_Shape()
+    if not BinTools.Read_s(shape, str(path)):
+        raise ValueError(f"invalid brep file: {path}")
+    return Compound.cast(shape)
+
+
+def write_brep(shape: "Shape", path: pathlib.Path):
+    from OCP.BinTools import BinTools
+
+    if not BinTools.Write_s(shape.wrapped, str(path)):
+        raise ValueError(f"failed to write brep file: {path}")
+
+
+class DiskCache:
+    # files keyed by content hash, evicted least-recently-used (by mtime) past max_bytes
+    def __init__(self, name: str, suffix: str, max_bytes: int):
+        self.name = name
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+
+    @property
+    def folder(self) -> pathlib.Path:
+        return get_cache_folder().joinpath(self.name)
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.folder.joinpath(f"{key}{self.suffix}")
+
+    def get(self, key: str) -> pathlib.Path | None:
+        if not enabled:
+            return None
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextlib.contextmanager
+    def put(self, key: str) -> typing.Iterator[pathlib.Path]:
+        if not enabled:
+            # written where it is dropped afterwards - the cache folder isn't touched
+            with tempfile.TemporaryDirectory() as folder:
+                yield pathlib.Path(folder).joinpath(f"{key}{self.suffix}")
+            return
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            yield temp_path
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for path in self.folder.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+SomeShape = typing.TypeVar("SomeShape", bound="Shape")
+
+
+def get_cached_shape(
+    cache: DiskCache, key: str, build: typing.Callable[[], SomeShape]
+) -> SomeShape:
+    cached = cache.get(key)
+    if cached:
+        return typing.cast(SomeShape, read_brep(cached))
+    shape = build()
+    with cache.put(key) as path:
+        write_brep(shape, path)
+    return shape
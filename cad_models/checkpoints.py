@@ -0,0 +1,164 @@
+import contextlib
+import json
+import typing
+import weakref
+
+from build123d import Builder, BuildPart, Mode, Part, Shape, add
+
+from cad_models.cache import DiskCache, hash_bytes, read_brep, write_brep
+from cad_models.keys import fingerprint, get_shape_hash
+from cad_models.timings import measure_stage
+
+
+class StageCheckpoints:
+    # key chains the part's source key with the name and inputs of each checkpointed
+    # stage so far - None once any other stage ran, its effects on later stages
+    # aren't known
+    def __init__(self, key: str | None):
+        self.key = key
+
+
+checkpoint_cache = DiskCache("checkpoints", ".bbrep", max_bytes=512 * 1024 * 1024)
+# the parameters each stage read when it last ran, by its key before its inputs
+checkpoint_reads_cache = DiskCache("checkpoint-reads", ".json", max_bytes=1024 * 1024)
+# set by build_part while it builds a part that may be cached
+checkpoint_key: str | None = None
+builder_checkpoints: weakref.WeakKeyDictionary[BuildPart, StageCheckpoints] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_builder_checkpoints(builder: BuildPart) -> StageCheckpoints:
+    checkpoints = builder_checkpoints.get(builder)
+    if checkpoints is None:
+        # only builders that start out empty can be resumed
+        key = checkpoint_key if builder.part is None else None
+        checkpoints = builder_checkpoints[builder] = StageCheckpoints(key)
+    return checkpoints
+
+
+class ParameterReads:
+    # the parameters as a checkpointed stage sees them - records the names it reads
+    def __init__(self, parameters: typing.Any):
+        object.__setattr__(self, "_parameters", parameters)
+        object.__setattr__(self, "_names", set())
+
+    def __getattr__(self, name: str) -> typing.Any:
+        value = getattr(self._parameters, name)
+        self._names.add(name)
+        return value
+
+    def __setattr__(self, name: str, value: typing.Any):
+        raise AttributeError(f"stages can't change parameters: {name}")
+
+
+def get_inputs_fingerprint(
+    fn: typing.Callable, parameters: typing.Any, inputs: dict[str, typing.Any]
+) -> str:
+    # a stage's inputs besides the parameters - e.g. a dependency's part - and what
+    # its function reads from an enclosing one. the parameters must come through its
+    # argument, so that the names it reads are recorded
+    closure = zip(fn.__code__.co_freevars, fn.__closure__ or ())
+    values = []
+    for name, value in [
+        *((name, cell.cell_contents) for name, cell in closure),
+        *sorted(inputs.items()),
+    ]:
+        if value is parameters:
+            raise TypeError(
+                f"stage {fn.__qualname__} reads the parameters other than through "
+                f"its argument"
+            )
+        if isinstance(value, Builder):
+            raise TypeError(
+                f"stage {fn.__qualname__} reads a builder - build the part it "
+                f"returns with its own"
+            )
+        if isinstance(value, Shape):
+            value = (get_shape_hash(value.wrapped), value.location.to_tuple())
+        values.append(f"{name}={fingerprint(value)}")
+    return "\n".join(values)
+
+
+def get_stage_key(reads_key: str, parameters: typing.Any, names: list[str]) -> str:
+    values = [f"{name}={fingerprint(getattr(parameters, name))}" for name in names]
+    return hash_bytes(reads_key.encode(), "\n".join(values).encode())
+
+
+class Stage:
+    # what stage() yields - see checkpoint()
+    def __init__(self, name: str, builder: BuildPart | None):
+        self.name = name
+        self.builder = builder
+        # the part checkpoint() left on the builder
+        self.part: Part | None = None
+        self.restored = False
+
+    def checkpoint(
+        self,
+        fn: typing.Callable[..., Part],
+        parameters: typing.Any,
+        **inputs: typing.Any,
+    ):
+        # runs fn(parameters, **inputs) - or fn(parameters, part, **inputs) once the
+        # builder has a part - and replaces the builder's part with the part it
+        # returns. fn builds that part with a BuildPart of its own, and only reads
+        # the parameters and inputs it is given. the names it reads are recorded,
+        # and a rebuild restores the part instead, until the first stage whose
+        # inputs changed
+        builder = self.builder
+        if builder is None:
+            raise ValueError("stage has no builder")
+        checkpoints = get_builder_checkpoints(builder)
+        args = [] if builder.part is None else [builder.part]
+        part = None
+        if checkpoints.key is None:
+            part = fn(parameters, *args, **inputs)
+        else:
+            inputs_key = get_inputs_fingerprint(fn, parameters, inputs)
+            reads_key = hash_bytes(
+                checkpoints.key.encode(), self.name.encode(), inputs_key.encode()
+            )
+            # a stage reads the same names as last time, as long as the values it
+            # branched on - which are among them - are the same. if they aren't, the
+            # key won't match
+            reads = checkpoint_reads_cache.get(reads_key)
+            if reads:
+                names = json.loads(reads.read_text())
+                key = get_stage_key(reads_key, parameters, names)
+                cached = checkpoint_cache.get(key)
+                if cached:
+                    part = Part(read_brep(cached).wrapped)
+                    self.restored = True
+            if part is None:
+                recorder = ParameterReads(parameters)
+                part = fn(recorder, *args, **inputs)
+                names = sorted(recorder._names)
+                key = get_stage_key(reads_key, parameters, names)
+                with checkpoint_cache.put(key) as path:
+                    write_brep(part, path)
+                with checkpoint_reads_cache.put(reads_key) as path:
+                    path.write_text(json.dumps(names))
+            checkpoints.key = key
+        add(part, clean=False, mode=Mode.REPLACE)
+        self.part = builder.part
+
+
+@contextlib.contextmanager
+def stage(name: str, builder: BuildPart | None = None) -> typing.Iterator[Stage]:
+    # a named stage of a builder function, timed under --timings - e.g.
+    #   with stage("fillet", builder):
+    #       fillet(...)
+    # a stage that only calls checkpoint() is restored on a rebuild - e.g.
+    #   with stage("fillet", builder) as s:
+    #       s.checkpoint(fillet_edges, p)
+    # anything else changes the part in ways later stages can't be keyed on
+    with measure_stage(name, builder) as timing:
+        current = Stage(name, builder)
+        yield current
+        if timing:
+            timing.restored = current.restored
+        if builder is not None and (
+            current.part is None or builder.part is not current.part
+        ):
+            get_builder_checkpoints(builder).key = None
@@ -0,0 +1,97 @@
+import argparse
+import os
+import pathlib
+from dataclasses import dataclass
+
+# the build command line - kept free of build123d, so that `python -m cad_models
+# MODEL --help` and usage errors don't wait for OCCT to load
+
+fidelities = ["draft", "full"]
+
+log_levels = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+
+@dataclass
+class MainArgs:
+    check: bool
+    export: pathlib.Path | None
+    fidelity: str
+    jobs: int
+    limit_hex_grid: bool
+    log_file: pathlib.Path | None
+    log_level: str
+    max_memory: str | None
+    memory: bool
+    no_cache: bool
+    ocp: bool
+    part: str | None
+    timings: bool
+    timings_json: pathlib.Path | None
+    variant: str | None
+    watch: bool
+
+
+def get_part_name(fn_name: str) -> str:
+    # box_builder_fn -> box, builder_fn -> part
+    return fn_name.removesuffix("builder_fn").rstrip("_") or "part"
+
+
+def create_parser(
+    prog: str | None, variants: list[str], parts: list[str]
+) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=prog)
+    parser.add_argument(
+        "--check",
+        default=False,
+        action="store_true",
+        help=(
+            "validate parameters without building - every variant by default. "
+            "validation itself is instant, but the model still loads OCCT"
+        ),
+    )
+    parser.add_argument("--export", type=pathlib.Path, default=None)
+    parser.add_argument("--fidelity", default="full", choices=fidelities)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--limit-hex-grid",
+        default=False,
+        action="store_true",
+        help="cut at most 5x5 cells of each hex grid - full grids are slow",
+    )
+    parser.add_argument(
+        "--log-file",
+        type=pathlib.Path,
+        default=None,
+        help="also write debug output to this file",
+    )
+    parser.add_argument("--log-level", default="WARNING", choices=log_levels)
+    parser.add_argument(
+        "--max-memory",
+        default=None,
+        help="fail a variant that adds more resident memory than this, e.g. 4G",
+    )
+    parser.add_argument("--memory", default=False, action="store_true")
+    parser.add_argument(
+        "--no-cache",
+        default=False,
+        action="store_true",
+        help="neither read nor write any disk cache - parts, tools, assets, meshes",
+    )
+    parser.add_argument("--ocp", default=False, action="store_true")
+    parser.add_argument(
+        "--part", default=None, help=f"a comma-separated list of: {', '.join(parts)}"
+    )
+    parser.add_argument("--timings", default=False, action="store_true")
+    parser.add_argument("--timings-json", type=pathlib.Path, default=None)
+    parser.add_argument(
+        "--variant",
+        default=None,
+        help=f"'all', or a comma-separated list of: {', '.join(variants)}",
+    )
+    parser.add_argument(
+        "--watch",
+        default=False,
+        action="store_true",
+        help="rebuild whenever the model's source changes",
+    )
+    return parser
@@ -1,20 +1,25 @@
-import argparse
+import collections
 import copy
-import logging
+import functools
+import inspect
 import math
-import pathlib
+import re
 import typing
+import weakref
 from dataclasses import dataclass
 from typing import ClassVar
 
+import numpy
 from build123d import *
-from ocp_vscode.show import show_object
+from build123d import Shape
 
-from cad_models.data import get_data_file
+from cad_models.cache import DiskCache, get_cached_shape, hash_bytes
+from cad_models.data import get_data_metadata, get_data_shape
+from cad_models.keys import fingerprint, get_dependency_fingerprint
 
-logger = logging.getLogger("build123d")
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler())
+# models only import this module - the rest of their api lives with its concern
+from cad_models.checkpoints import stage  # isort: skip
+from cad_models.selectors import select_edges, select_faces  # isort: skip
 
 U = 1.75 * IN
 
@@ -28,6 +33,36 @@ def require(obj: SomeObj | None) -> SomeObj:
     return obj
 
 
+# set by run_variant_job from --fidelity - draft skips or simplifies costly detail
+# (fillets, hex grids, fastener holes, keystone receivers) for faster layout work
+fidelity = "full"
+
+
+def is_draft() -> bool:
+    return fidelity == "draft"
+
+
+# set by run_variant_job from --limit-hex-grid - full density grids are still most of
+# a shelf's build time
+limit_hex_grid = False
+
+
+def get_metric_diameter(size: str) -> float:
+    # "M3-0.5" -> 3mm, e.g. to stand in for bd_warehouse fasteners in draft builds
+    match = re.match(r"M(\d+(?:\.\d+)?)\b", size)
+    if not match:
+        raise ValueError(f"invalid metric size: {size}")
+    return float(match.group(1)) * MM
+
+
+SomeShape = typing.TypeVar("SomeShape", bound=Shape)
+
+
+def place(shape: SomeShape, location: Location) -> SomeShape:
+    # Shape.moved deep copies the shape first - a placed copy shares its TShape instead
+    return type(shape)(shape.wrapped.Moved(location.wrapped))
+
+
 class KeystoneReceiver(BasePartObject):
     _applies_to = [BuildPart._tag]
     _solid: ClassVar[Solid | None] = None
@@ -35,24 +70,25 @@ class KeystoneReceiver(BasePartObject):
     @classmethod
     def get_solid(cls) -> Solid:
         if not cls._solid:
-            step_file = get_data_file("keystone-receiver.step")
-            solid = import_step(step_file)
+            solid = get_data_shape("keystone-receiver.step")
             if not isinstance(solid, Solid):
                 raise TypeError(solid)
             cls._solid = solid
         return copy.copy(cls._solid)
 
+    # dimensions come from precomputed metadata so that they can be used (e.g. as
+    # dataclass defaults) without importing the asset
     @classmethod
     def depth(cls) -> float:
-        return cls.get_solid().bounding_box().size.Y
+        return get_data_metadata("keystone-receiver.step")["depth"]
 
     @classmethod
     def height(cls) -> float:
-        return cls.get_solid().bounding_box().size.Z
+        return get_data_metadata("keystone-receiver.step")["height"]
 
     @classmethod
     def width(cls) -> float:
-        return cls.get_solid().bounding_box().size.X
+        return get_data_metadata("keystone-receiver.step")["width"]
 
     def __init__(
         self,
@@ -70,26 +106,174 @@ class KeystoneReceiver(BasePartObject):
         joint_location = Location(face.location_at(0.5, 0.5).position, (0, 0, 0))
         RigidJoint("joint", self, joint_location)
 
+    @classmethod
+    def instances(cls, joint_locations: typing.Iterable[Location]) -> list[Solid]:
+        # every instance shares the receiver's TShape and only differs by location,
+        # so callers can fuse all of them with a single add()
+        with BuildPart(mode=Mode.PRIVATE):
+            receiver = cls()
+        receiver_joint = typing.cast(RigidJoint, receiver.joints["joint"])
+        offset = receiver_joint.relative_location.inverse()
+        solid = receiver.solid()
+        if is_draft():
+            box = solid.bounding_box()
+            solid = Solid.make_box(box.size.X, box.size.Y, box.size.Z, Plane(box.min))
+        return [place(solid, location * offset) for location in joint_locations]
+
+
+def build_hex_grid(
+    width: float,
+    height: float,
+    radius: float,
+    spacing: float,
+    depth: float,
+    limit: bool = False,
+) -> Compound:
+    # same lattice as HexLocations(actual_spacing, count_x, count_y), centered on the
+    # origin - computed in one pass rather than one Location (and one sketch fuse)
+    # per cell
+    actual_spacing = radius + (spacing / 2)
+    x_spacing = math.sqrt(3) * actual_spacing
+    y_spacing = 2 * actual_spacing
+    count_x = int((width - radius) / x_spacing)
+    count_y = int((height - radius) / y_spacing)
+    if count_x < 1 or count_y < 1:
+        raise ValueError(f"hex grid does not fit: {width} x {height}")
+    if limit:
+        count_x = min(count_x, 5)
+        count_y = min(count_y, 5)
+    columns, rows = numpy.meshgrid(
+        numpy.arange(count_x), numpy.arange(count_y), indexing="ij"
+    )
+    xs = columns * x_spacing
+    ys = rows * y_spacing + numpy.where(columns % 2, y_spacing, y_spacing / 2)
+    xs -= (xs.min() + xs.max()) / 2
+    ys -= (ys.min() + ys.max()) / 2
+
+    # equivalent to RegularPolygon(radius, 6, major_radius=False) - built with the
+    # topology api so nothing leaks into an active builder
+    major_radius = radius / math.cos(math.pi / 6)
+    points = [
+        (major_radius * math.cos(angle), major_radius * math.sin(angle))
+        for angle in numpy.linspace(0, 2 * math.pi, 6, endpoint=False)
+    ]
+    hexagon = Face(Wire.make_polygon(points, close=True))
+
+    # every cell is the same prism moved into place, so the grid is cut with a single
+    # boolean.  the prism overshoots both ends of [0, -depth] slightly - caps coplanar
+    # with the faces being cut roughly double the cost of the boolean.
+    overshoot = 0.01 * MM
+    prism = Solid.extrude(
+        hexagon.moved(Pos(Z=overshoot)), (0, 0, -depth - (overshoot * 2))
+    )
+    cells = [place(prism, Pos(x, y)) for x, y in zip(xs.flat, ys.flat)]
+    return Compound(children=cells)
+
+
+hex_grid_cache = DiskCache("hex-grids", ".bbrep", max_bytes=256 * 1024 * 1024)
+
+
+# identical trays (and reruns) share one cut tool - treat the result as read-only
+def hex_grid(
+    width: float, height: float, radius: float, spacing: float, depth: float
+) -> Compound:
+    return get_hex_grid(width, height, radius, spacing, depth, limit_hex_grid)
+
+
+@functools.lru_cache(maxsize=32)
+def get_hex_grid(
+    width: float,
+    height: float,
+    radius: float,
+    spacing: float,
+    depth: float,
+    limit: bool,
+) -> Compound:
+    key = hash_bytes(
+        inspect.getsource(build_hex_grid).encode(),
+        repr((width, height, radius, spacing, depth, limit)).encode(),
+        get_dependency_fingerprint().encode(),
+    )
+    return get_cached_shape(
+        hex_grid_cache,
+        key,
+        lambda: build_hex_grid(width, height, radius, spacing, depth, limit),
+    )
+
+
+hole_tool_cache = DiskCache("hole-tools", ".bbrep", max_bytes=64 * 1024 * 1024)
+
+
+def build_fastener_hole(
+    hole_type: type,
+    fastener_class: type,
+    size: str,
+    depth: float,
+    length: float | None,
+    fastener_type: str | None,
+) -> Shape:
+    fastener_kwargs: dict[str, typing.Any] = {}
+    if length is not None:
+        fastener_kwargs["length"] = length
+    if fastener_type is not None:
+        fastener_kwargs["fastener_type"] = fastener_type
+    with BuildPart(mode=Mode.PRIVATE):
+        fastener = fastener_class(size, **fastener_kwargs)
+        hole = hole_type(fastener, depth=depth, mode=Mode.PRIVATE)
+    return require(hole)
+
+
+# hole tools are placed at the origin, cutting down -Z - stamp them with add() under
+# a LocationList (e.g. GridLocations), which subtracts every location in one boolean.
+# treat the result as read-only
+
+
+@functools.lru_cache(maxsize=32)
+def fastener_hole(
+    hole_type: type,
+    fastener_class: type,
+    size: str,
+    depth: float,
+    length: float | None = None,
+    fastener_type: str | None = None,
+) -> Shape:
+    # e.g. fastener_hole(ClearanceHole, PanHeadScrew, "M3-0.5", depth, length=5) - the
+    # fastener (and its thread geometry) is only built when the tool isn't cached
+    values = [hole_type, fastener_class, size, depth, length, fastener_type]
+    key = hash_bytes(
+        inspect.getsource(build_fastener_hole).encode(),
+        repr([getattr(v, "__qualname__", v) for v in values]).encode(),
+        get_dependency_fingerprint().encode(),
+    )
+    return get_cached_shape(
+        hole_tool_cache,
+        key,
+        lambda: build_fastener_hole(
+            hole_type, fastener_class, size, depth, length, fastener_type
+        ),
+    )
 
-def hex_grid(width: float, height: float, radius: float, spacing: float) -> Sketch:
-    with BuildSketch(mode=Mode.PRIVATE) as builder:
-        actual_spacing = radius + (spacing / 2)
-        count_x = int((width - radius) / (math.sqrt(3) * actual_spacing))
-        count_y = int((height - radius) / (2 * actual_spacing))
-        if limit_hex_grid:
-            count_x = min(count_x, 5)
-            count_y = min(count_y, 5)
-        with HexLocations(actual_spacing, count_x, count_y, major_radius=False):
-            RegularPolygon(radius, 6, major_radius=False)
-    return builder.sketch
 
+def build_counter_sink_hole(
+    radius: float, counter_sink_radius: float, depth: float
+) -> Shape:
+    with BuildPart(mode=Mode.PRIVATE):
+        hole = CounterSinkHole(radius, counter_sink_radius, depth, mode=Mode.PRIVATE)
+    return require(hole)
 
-@dataclass
-class MainArgs:
-    export: pathlib.Path | None
-    limit_hex_grid: bool
-    ocp: bool
-    variant: str
+
+@functools.lru_cache(maxsize=32)
+def counter_sink_hole(radius: float, counter_sink_radius: float, depth: float) -> Shape:
+    key = hash_bytes(
+        inspect.getsource(build_counter_sink_hole).encode(),
+        repr((radius, counter_sink_radius, depth)).encode(),
+        get_dependency_fingerprint().encode(),
+    )
+    return get_cached_shape(
+        hole_tool_cache,
+        key,
+        lambda: build_counter_sink_hole(radius, counter_sink_radius, depth),
+    )
 
 
 TParameter = typing.TypeVar("TParameter", contravariant=True)
@@ -99,51 +283,89 @@ class BuildPartFn(typing.Protocol, typing.Generic[TParameter]):
     def __call__(self, p: TParameter) -> BuildPart: ...
 
 
-limit_hex_grid: bool
+@dataclass
+class Model(typing.Generic[TParameter]):
+    build_part_fns: list[BuildPartFn[TParameter]]
+    variants: dict[str, TParameter]
+
+
+SomeFn = typing.TypeVar("SomeFn", bound=typing.Callable)
+
+
+def depends_on(**dependencies: BuildPartFn) -> typing.Callable[[SomeFn], SomeFn]:
+    # e.g. @depends_on(cover=cover_builder_fn) - the decorated function is called as
+    # fn(p, cover=<cover part>), with each dependency built at most once per run.
+    # dependency parts are shared - place copies rather than mutating them
+    def decorator(fn: SomeFn) -> SomeFn:
+        setattr(fn, "dependencies", dependencies)
+        return fn
+
+    return decorator
+
 
+def get_dependencies(build_part_fn: BuildPartFn) -> dict[str, BuildPartFn]:
+    return getattr(build_part_fn, "dependencies", {})
 
-def main(
-    build_part_fns: BuildPartFn[TParameter] | list[BuildPartFn[TParameter]],
-    variants: dict[str, TParameter] | TParameter,
-):
-    global limit_hex_grid
 
-    if not isinstance(build_part_fns, list):
-        build_part_fns = [build_part_fns]
-    if not isinstance(variants, dict):
-        variants = {"default": variants}
+def get_device_key(device: typing.Any) -> str:
+    # the parameters' device fields are left out - they would tie otherwise identical
+    # devices to their position on the shelf
+    def is_device(value: typing.Any) -> bool:
+        if isinstance(value, list):
+            return any(is_device(item) for item in value)
+        return getattr(value, "p", None) is device.p
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--export", type=pathlib.Path, default=None)
-    parser.add_argument("--limit-hex-grid", default=False, action="store_true")
-    parser.add_argument("--ocp", default=False, action="store_true")
-    parser.add_argument("--variant", default="default", choices=variants.keys())
-    args = MainArgs(**vars(parser.parse_args()))
+    device_values = {k: v for k, v in vars(device).items() if k != "p"}
+    parameter_values = {k: v for k, v in vars(device.p).items() if not is_device(v)}
+    return fingerprint([device_values, parameter_values])
 
-    parameters = variants.get(args.variant)
-    if not parameters:
-        raise ValueError(f"invalid variant: {args.variant}")
 
-    limit_hex_grid = args.limit_hex_grid
+SomeDevice = typing.TypeVar("SomeDevice")
 
-    parts = []
-    for build_part_fn in build_part_fns:
-        part = require(build_part_fn(parameters).part)
-        parts.append(part)
 
-    packed = pack(parts, 5 * MM, align_z=True)
+# held weakly - the memos of a module reloaded by --watch go with its old functions
+device_memos: weakref.WeakSet[typing.Callable] = weakref.WeakSet()
 
-    if args.ocp:
-        show_object(packed)
 
-    if args.export:
-        extension = args.export.suffix
-        if extension == ".step":
-            compound = Compound(children=[*packed])
-            export_step(compound, args.export)
-        elif extension == ".3mf":
-            mesher = Mesher()
-            mesher.add_shape(packed)
-            mesher.write(args.export)
+def memoize_device(
+    fn: typing.Callable[[SomeDevice], SomeObj], maxsize: int = 32
+) -> typing.Callable[[SomeDevice], SomeObj]:
+    # results are shared between devices - place copies rather than mutating them.
+    # least recently used results are dropped past maxsize, so that warm processes
+    # (--watch, build server workers) don't keep every part they ever built
+    results: collections.OrderedDict[tuple[type, str, str, bool], SomeObj] = (
+        collections.OrderedDict()
+    )
+
+    @functools.wraps(fn)
+    def wrapper(device: SomeDevice) -> SomeObj:
+        key = (type(device), get_device_key(device), fidelity, limit_hex_grid)
+        if key in results:
+            results.move_to_end(key)
         else:
-            raise ValueError(f"invalid export file extension: {extension}")
+            results[key] = fn(device)
+            if len(results) > maxsize:
+                results.popitem(last=False)
+        return results[key]
+
+    setattr(wrapper, "cache_clear", results.clear)
+    device_memos.add(wrapper)
+    return wrapper
+
+
+def clear_caches():
+    # in-process caches only - e.g. so that repeated builds can be measured
+    KeystoneReceiver._solid = None
+    get_hex_grid.cache_clear()
+    fastener_hole.cache_clear()
+    counter_sink_hole.cache_clear()
+    for wrapper in list(device_memos):
+        getattr(wrapper, "cache_clear")()
+
+
+def main(*args, **kwargs):
+    # models end with main(...) - the job runner is imported lazily, as it imports
+    # this module
+    from cad_models.jobs import main
+
+    return main(*args, **kwargs)
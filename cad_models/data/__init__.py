@@ -1,10 +1,64 @@
+import functools
+import json
 import pathlib
+import typing
+
+from cad_models.cache import DiskCache, hash_file, read_brep, write_brep
+
+if typing.TYPE_CHECKING:
+    from build123d import Shape
 
 folder = pathlib.Path(__file__).parent
 
+asset_cache = DiskCache("assets", ".bbrep", max_bytes=256 * 1024 * 1024)
+
 
 def get_data_file(filename: str) -> pathlib.Path:
     data_file = folder.joinpath(filename)
     if not data_file.exists():
         raise FileNotFoundError(data_file)
     return data_file
+
+
+def get_data_shape(filename: str) -> "Shape":
+    data_file = get_data_file(filename)
+    key = f"{data_file.stem}-{hash_file(data_file)}"
+    cached = asset_cache.get(key)
+    if cached:
+        return read_brep(cached)
+    if data_file.suffix != ".step":
+        raise ValueError(f"unsupported data file: {data_file}")
+    from build123d import import_step
+
+    shape = import_step(data_file)
+    with asset_cache.put(key) as path:
+        write_brep(shape, path)
+    return shape
+
+
+def get_data_metadata_file(filename: str) -> pathlib.Path:
+    return get_data_file(filename).with_suffix(".json")
+
+
+@functools.cache
+def get_data_metadata(filename: str) -> dict[str, typing.Any]:
+    data_file = get_data_file(filename)
+    metadata_file = get_data_metadata_file(filename)
+    metadata = json.loads(metadata_file.read_text())
+    if metadata["sha256"] != hash_file(data_file):
+        raise ValueError(f"stale metadata (run write_data_metadata): {metadata_file}")
+    return metadata
+
+
+def write_data_metadata(filename: str):
+    shape = get_data_shape(filename)
+    size = shape.bounding_box().size
+    metadata = {
+        "sha256": hash_file(get_data_file(filename)),
+        "width": size.X,
+        "depth": size.Y,
+        "height": size.Z,
+    }
+    metadata_file = get_data_metadata_file(filename)
+    metadata_file.write_text(json.dumps(metadata, indent=2) + "\n")
+    get_data_metadata.cache_clear()
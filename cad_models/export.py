@@ -0,0 +1,53 @@
+import json
+import pathlib
+import shutil
+import typing
+
+from build123d import Compound, Mesher, Shape, export_step
+
+from cad_models.cache import DiskCache, hash_bytes
+from cad_models.keys import get_dependency_fingerprint, get_shape_hash
+
+mesh_cache = DiskCache("meshes", ".3mf", max_bytes=512 * 1024 * 1024)
+
+
+def get_mesh_key(shapes: list[Shape], **settings: typing.Any) -> str:
+    # every shape as Mesher.add_shape sees it - its brep, placement, label and color
+    values = [
+        f"{get_shape_hash(s.wrapped)} {s.location.to_tuple()} {s.label!r} {s.color!r}"
+        for s in shapes
+    ]
+    return hash_bytes(
+        "\n".join(values).encode(),
+        json.dumps(settings, sort_keys=True).encode(),
+        get_dependency_fingerprint(("build123d", "cadquery-ocp", "lib3mf")).encode(),
+    )
+
+
+def show_shapes(shapes: list[Shape]):
+    from ocp_vscode.show import show_object
+
+    show_object(shapes)
+
+
+def export_shapes(shapes: list[Shape], export: pathlib.Path):
+    extension = export.suffix
+    if extension == ".step":
+        compound = Compound(children=[*shapes])
+        export_step(compound, export)
+    elif extension == ".3mf":
+        # reruns of unchanged parts (e.g. a --watch save that didn't change the
+        # geometry) copy the last export rather than meshing again
+        settings = {"linear_deflection": 0.001, "angular_deflection": 0.1}
+        key = get_mesh_key(shapes, **settings)
+        cached = mesh_cache.get(key)
+        if cached:
+            shutil.copyfile(cached, export)
+            return
+        mesher = Mesher()
+        mesher.add_shape(shapes, **settings)
+        mesher.write(export)
+        with mesh_cache.put(key) as path:
+            shutil.copyfile(export, path)
+    else:
+        raise ValueError(f"invalid export file extension: {extension}")
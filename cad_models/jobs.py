@@ -0,0 +1,331 @@
+import contextlib
+import ctypes
+import dataclasses
+import gc
+import importlib
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+import traceback
+import tracemalloc
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from cad_models import cli, common, memory, timings
+from cad_models.cache import bypass_caches
+from cad_models.cli import MainArgs, create_parser
+from cad_models.common import BuildPartFn, Model, TParameter, clear_caches
+from cad_models.export import export_shapes, show_shapes
+from cad_models.memory import (
+    MemoryBudgetError,
+    get_peak_rss,
+    get_rss,
+    memory_watchdog,
+    parse_bytes,
+)
+from cad_models.parts import build_variant, validate_parameters
+from cad_models.timings import StageTiming, measure, print_stage_timings, print_table
+
+# the handlers added by configure_logging - replaced, not added to, on each call
+logging_handlers: list[logging.Handler] = []
+
+
+def configure_logging(level: str, log_file: pathlib.Path | None = None):
+    # nothing is configured at import - build123d formats its records lazily, so
+    # debug calls are skipped cheaply unless a handler asks for them
+    logger = logging.getLogger("build123d")
+    for handler in logging_handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    logging_handlers.clear()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(level)
+    logging_handlers.append(stream_handler)
+    logger.setLevel(level)
+    if log_file:
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setLevel(logging.DEBUG)
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        file_handler.setFormatter(formatter)
+        logging_handlers.append(file_handler)
+        logger.setLevel(logging.DEBUG)
+    for handler in logging_handlers:
+        logger.addHandler(handler)
+
+
+def get_part_name(build_part_fn: BuildPartFn) -> str:
+    return cli.get_part_name(build_part_fn.__name__)
+
+
+def get_part_fns(value: str, build_part_fns: list[BuildPartFn]) -> list[BuildPartFn]:
+    part_fns = {get_part_name(fn): fn for fn in build_part_fns}
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    for name in names:
+        if name not in part_fns:
+            raise ValueError(f"invalid part: {name}")
+    if not names:
+        raise ValueError(f"invalid part: {value}")
+    return [part_fns[name] for name in names]
+
+
+def get_variant_names(value: str, variants: dict[str, typing.Any]) -> list[str]:
+    if value == "all":
+        return list(variants.keys())
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    for name in names:
+        if name not in variants:
+            raise ValueError(f"invalid variant: {name}")
+    if not names:
+        raise ValueError(f"invalid variant: {value}")
+    return names
+
+
+@dataclass
+class VariantJob(typing.Generic[TParameter]):
+    build_part_fns: list[BuildPartFn[TParameter]]
+    cache: bool
+    export: pathlib.Path | None
+    fidelity: str
+    limit_hex_grid: bool
+    max_memory: int | None
+    memory: bool
+    model: str
+    ocp: bool
+    parameters: TParameter
+    timings: bool
+    variant: str
+    warm: bool
+
+
+def release_memory():
+    # drop in-process caches and builder garbage so that memory does not accumulate
+    # across the variants of a batch
+    clear_caches()
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (AttributeError, OSError):
+        pass
+
+
+def run_variant_job(job: VariantJob) -> list[StageTiming]:
+    common.fidelity = job.fidelity
+    common.limit_hex_grid = job.limit_hex_grid
+    memory.memory_budget = job.max_memory
+    memory.memory_baseline = get_rss() or get_peak_rss()
+    timings.stage_timings = [] if job.timings or job.memory else None
+    if job.memory:
+        tracemalloc.start()
+
+    watchdog = memory_watchdog() if job.max_memory else None
+    total = StageTiming("total")
+    try:
+        with (
+            watchdog or contextlib.nullcontext(),
+            contextlib.nullcontext() if job.cache else bypass_caches(),
+            measure(total),
+        ):
+            packed = build_variant(job.build_part_fns, job.parameters, cache=job.cache)
+
+            if job.ocp:
+                # the viewer is only imported when asked for - headless builds skip it
+                show_shapes(packed)
+
+            if job.export:
+                export = pathlib.Path(
+                    str(job.export).format(model=job.model, variant=job.variant)
+                )
+                export.parent.mkdir(parents=True, exist_ok=True)
+                # written next to the export and renamed, so that a failed build
+                # doesn't leave a partial file behind
+                partial = export.with_name(
+                    f".{export.stem}.{os.getpid()}.tmp{export.suffix}"
+                )
+                try:
+                    export_shapes(packed, partial)
+                    os.replace(partial, export)
+                finally:
+                    partial.unlink(missing_ok=True)
+    except MemoryBudgetError:
+        # warm processes too - their next build would start over the budget
+        if job.warm:
+            release_memory()
+        raise
+    finally:
+        if job.memory:
+            tracemalloc.stop()
+        # warm processes (--watch, build server workers) keep their tool caches
+        if not job.warm:
+            release_memory()
+
+    if timings.stage_timings is None:
+        return []
+    return [*timings.stage_timings, total]
+
+
+def check_variants(variants: dict[str, typing.Any], variant_names: list[str]) -> bool:
+    rows = [("variant", "result")]
+    valid = True
+    for variant_name in variant_names:
+        try:
+            validate_parameters(variants[variant_name])
+        except ValueError as e:
+            rows.append((variant_name, f"error: {e}"))
+            valid = False
+        else:
+            rows.append((variant_name, "ok"))
+    print_table(rows, left_columns=2)
+    return valid
+
+
+def reload_model(name: str) -> Model:
+    module_name = f"cad_models.{name}"
+    module = sys.modules.get(module_name)
+    # scripts run as __main__ - their first import under the package name is fresh
+    if module:
+        module = importlib.reload(module)
+    else:
+        module = importlib.import_module(module_name)
+    return module.model
+
+
+def watch_variant_job(job: VariantJob, part: str | None, interval: float = 0.25):
+    # rebuilds in this (warm) process whenever the model's source changes - assets,
+    # hole tools and hex grids stay loaded, only the model module is reloaded
+    path = pathlib.Path(inspect.getfile(job.build_part_fns[0]))
+    rebuild = True
+    while True:
+        mtime = path.stat().st_mtime_ns
+        if rebuild:
+            wall_time = time.perf_counter()
+            try:
+                stage_timings = run_variant_job(job)
+            except Exception:
+                traceback.print_exc()
+            else:
+                if stage_timings:
+                    print_stage_timings({job.variant: stage_timings}, memory=job.memory)
+                wall_time = time.perf_counter() - wall_time
+                print(f"built {job.model} {job.variant} in {wall_time:.2f}s")
+        print(f"watching {path} for changes")
+        while path.stat().st_mtime_ns == mtime:
+            time.sleep(interval)
+        try:
+            model = reload_model(job.model)
+            build_part_fns = model.build_part_fns
+            if part:
+                build_part_fns = get_part_fns(part, build_part_fns)
+            parameters = model.variants[job.variant]
+        except Exception:
+            # keep the last good model until the next save
+            traceback.print_exc()
+            rebuild = False
+            continue
+        rebuild = True
+        job = dataclasses.replace(
+            job, build_part_fns=build_part_fns, parameters=parameters
+        )
+
+
+def run_variant_jobs(jobs: list[VariantJob], max_jobs: int) -> list[list[StageTiming]]:
+    if max_jobs <= 1 or len(jobs) <= 1:
+        return [run_variant_job(job) for job in jobs]
+    # builder functions usually live in __main__ - fork so workers can resolve
+    # them and inherit module state (e.g. imported assets) without re-running
+    # scripts
+    mp_context = multiprocessing.get_context("fork")
+    max_workers = min(max_jobs, len(jobs))
+    with ProcessPoolExecutor(max_workers, mp_context=mp_context) as executor:
+        return list(executor.map(run_variant_job, jobs))
+
+
+def main(
+    build_part_fns: BuildPartFn[TParameter] | list[BuildPartFn[TParameter]],
+    variants: dict[str, TParameter] | TParameter,
+    args: list[str] | None = None,
+    prog: str | None = None,
+):
+    if not isinstance(build_part_fns, list):
+        build_part_fns = [build_part_fns]
+    if not isinstance(variants, dict):
+        variants = {"default": variants}
+
+    parts = [get_part_name(fn) for fn in build_part_fns]
+    parser = create_parser(prog, list(variants), parts)
+    args = MainArgs(**vars(parser.parse_args(args)))
+
+    configure_logging(args.log_level, args.log_file)
+
+    model = pathlib.Path(inspect.getfile(build_part_fns[0])).stem
+    try:
+        variant_names = get_variant_names(
+            args.variant or ("all" if args.check else "default"), variants
+        )
+        if args.part:
+            build_part_fns = get_part_fns(args.part, build_part_fns)
+        max_memory = parse_bytes(args.max_memory) if args.max_memory else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.check:
+        if not check_variants(variants, variant_names):
+            raise SystemExit(1)
+        return
+
+    if len(variant_names) > 1:
+        if args.ocp:
+            parser.error("--ocp requires a single variant")
+        if args.watch:
+            parser.error("--watch requires a single variant")
+        if args.export and "{variant}" not in str(args.export):
+            parser.error(f"export path requires a {{variant}} field: {args.export}")
+
+    jobs = []
+    for variant_name in variant_names:
+        job = VariantJob(
+            build_part_fns=build_part_fns,
+            cache=not args.no_cache,
+            export=args.export,
+            fidelity=args.fidelity,
+            limit_hex_grid=args.limit_hex_grid,
+            max_memory=max_memory,
+            memory=args.memory,
+            model=model,
+            ocp=args.ocp,
+            parameters=variants[variant_name],
+            timings=args.timings or args.timings_json is not None,
+            variant=variant_name,
+            warm=args.watch,
+        )
+        jobs.append(job)
+
+    if args.watch:
+        try:
+            watch_variant_job(jobs[0], args.part)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        results = run_variant_jobs(jobs, args.jobs)
+    except MemoryBudgetError as e:
+        raise SystemExit(str(e)) from None
+    except BrokenProcessPool:
+        raise SystemExit("build worker exited unexpectedly") from None
+
+    variant_timings = dict(zip(variant_names, results))
+    if args.timings or args.memory:
+        print_stage_timings(variant_timings, memory=args.memory)
+    if args.timings_json:
+        data = {
+            variant: [dataclasses.asdict(timing) for timing in timings]
+            for variant, timings in variant_timings.items()
+        }
+        args.timings_json.write_text(json.dumps(data, indent=2))
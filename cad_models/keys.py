@@ -0,0 +1,83 @@
+import ast
+import dataclasses
+import functools
+import importlib.metadata
+import io
+import typing
+
+from OCP.BinTools import BinTools
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS_Shape
+
+from cad_models.cache import hash_bytes
+
+
+def fingerprint(obj: typing.Any, seen: frozenset[int] = frozenset()) -> str:
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return repr(obj)
+    if id(obj) in seen:
+        return f"<cycle {type(obj).__qualname__}>"
+    seen = seen | {id(obj)}
+    if isinstance(obj, (list, tuple)):
+        items = ", ".join(fingerprint(item, seen) for item in obj)
+        return f"{type(obj).__qualname__}[{items}]"
+    if isinstance(obj, dict):
+        items = sorted(
+            f"{fingerprint(k, seen)}: {fingerprint(v, seen)}" for k, v in obj.items()
+        )
+        return f"dict{{{', '.join(items)}}}"
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        values = {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    elif hasattr(obj, "__dict__"):
+        values = vars(obj)
+    else:
+        return repr(obj)
+    items = ", ".join(f"{k}={fingerprint(v, seen)}" for k, v in sorted(values.items()))
+    return f"{type(obj).__module__}.{type(obj).__qualname__}({items})"
+
+
+def get_shape_hash(shape: TopoDS_Shape) -> str:
+    # the shape's own location is left out - e.g. packed copies of a part share it
+    stream = io.BytesIO()
+    BinTools.Write_s(shape.Located(TopLoc_Location()), stream)
+    return hash_bytes(stream.getvalue())
+
+
+@functools.cache
+def get_dependency_fingerprint(
+    names: tuple[str, ...] = ("build123d", "bd_warehouse", "cadquery-ocp")
+) -> str:
+    values = []
+    for name in names:
+        try:
+            distribution = importlib.metadata.distribution(name)
+        except importlib.metadata.PackageNotFoundError:
+            values.append(f"{name}=missing")
+            continue
+        # git pins report a placeholder version - the commit id lives in direct_url.json
+        direct_url = distribution.read_text("direct_url.json") or ""
+        values.append(f"{name}={distribution.version} {direct_url}")
+    return "\n".join(values)
+
+
+@functools.lru_cache(maxsize=64)
+def get_code(source: str) -> str:
+    # a model's source without its parameter values - the defaults of its dataclass
+    # fields and its variants. keys fingerprint the values a part or stage reads, so
+    # that editing a default doesn't invalidate the work that doesn't read it
+    tree = ast.parse(source)
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and ast.unparse(node.targets[0]) == "model":
+            continue
+        if isinstance(node, ast.ClassDef) and any(
+            ast.unparse(decorator).split("(")[0]
+            in ("dataclass", "dataclasses.dataclass")
+            for decorator in node.decorator_list
+        ):
+            for item in node.body:
+                if isinstance(item, ast.AnnAssign):
+                    item.value = None
+        body.append(node)
+    tree.body = body
+    return ast.unparse(tree)
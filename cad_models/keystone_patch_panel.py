@@ -1,7 +1,6 @@
-import typing
-
 from build123d import *
-from common import *
+
+from cad_models.common import *
 
 
 @dataclass
@@ -19,50 +18,70 @@ class Parameters:
     def inner_width(self):
         return self.panel_width - (self.ear_width * 2)
 
+    def validate(self):
+        if self.keystone_count < 1:
+            raise ValueError(f"invalid keystone count: {self.keystone_count}")
+        keystones_width = KeystoneReceiver.width() * self.keystone_count
+        if keystones_width > self.inner_width:
+            raise ValueError(
+                f"{self.keystone_count} keystones are {keystones_width:.1f}mm wide, "
+                f"the panel only fits {self.inner_width:.1f}mm"
+            )
+        if KeystoneReceiver.height() > self.panel_height:
+            raise ValueError(
+                f"keystones are {KeystoneReceiver.height():.1f}mm tall, the panel "
+                f"is only {self.panel_height:.1f}mm"
+            )
+
 
 def builder_fn(p: Parameters) -> BuildPart:
     with BuildPart() as builder:
-        # panel
-        with BuildSketch(Plane.XZ):
-            Rectangle(p.inner_width, p.panel_height)
-        extrude(amount=p.panel_thickness)
+        with stage("panel", builder):
+            with BuildSketch(Plane.XZ):
+                Rectangle(p.inner_width, p.panel_height)
+            extrude(amount=p.panel_thickness)
 
-        # ears
-        with BuildSketch(Plane.XZ):
-            location = Location((0, 0))
-            location *= Pos(X=-(p.inner_width + p.ear_width) / 2)
-            with Locations(location):
-                Rectangle(p.ear_width, p.panel_height)
-                vertical_spacing = p.panel_height - (0.5 * IN)
-                with GridLocations(0, vertical_spacing, 1, 2):
-                    SlotOverall(p.ear_hole_width, p.ear_hole_height, mode=Mode.SUBTRACT)
-            mirror(about=Plane.YZ)
-        extrude(amount=p.ear_thickness)
+        with stage("ears", builder):
+            with BuildSketch(Plane.XZ):
+                location = Location((0, 0))
+                location *= Pos(X=-(p.inner_width + p.ear_width) / 2)
+                with Locations(location):
+                    Rectangle(p.ear_width, p.panel_height)
+                    vertical_spacing = p.panel_height - (0.5 * IN)
+                    with GridLocations(0, vertical_spacing, 1, 2):
+                        SlotOverall(
+                            p.ear_hole_width, p.ear_hole_height, mode=Mode.SUBTRACT
+                        )
+                mirror(about=Plane.YZ)
+            extrude(amount=p.ear_thickness)
 
-        # keystone cutouts
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        keystone_locations = []
-        with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-            horizontal_spacing = KeystoneReceiver.width() + (
-                max(0, p.inner_width - (KeystoneReceiver.width() * p.keystone_count))
-                / p.keystone_count
-            )
-            with GridLocations(horizontal_spacing, 0, p.keystone_count, 1) as grid_locs:
-                Rectangle(KeystoneReceiver.width(), KeystoneReceiver.height())
-                for location in grid_locs.locations:
-                    keystone_location = location * Rot(X=-90)
-                    keystone_locations.append(keystone_location)
-        extrude(amount=-p.panel_thickness, mode=Mode.SUBTRACT)
+        with stage("keystone cutouts", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            keystone_locations = []
+            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                horizontal_spacing = KeystoneReceiver.width() + (
+                    max(
+                        0, p.inner_width - (KeystoneReceiver.width() * p.keystone_count)
+                    )
+                    / p.keystone_count
+                )
+                with GridLocations(
+                    horizontal_spacing, 0, p.keystone_count, 1
+                ) as grid_locs:
+                    Rectangle(KeystoneReceiver.width(), KeystoneReceiver.height())
+                    for location in grid_locs.locations:
+                        keystone_location = location * Rot(X=-90)
+                        keystone_locations.append(keystone_location)
+            extrude(amount=-p.panel_thickness, mode=Mode.SUBTRACT)
 
-        # keystone receivers
-        for index, joint_location in enumerate(keystone_locations):
-            with BuildPart(mode=Mode.PRIVATE):
-                receiver = KeystoneReceiver()
-            receiver_joint = typing.cast(RigidJoint, receiver.joints["joint"])
-            joint = RigidJoint(f"keystone-{index}", builder.part, joint_location)
-            joint.connect_to(receiver_joint)
-            add(receiver)
+        with stage("keystone receivers", builder):
+            if keystone_locations:
+                add(KeystoneReceiver.instances(keystone_locations))
     return builder
 
 
-main(builder_fn, Parameters())
+model = Model([builder_fn], {"default": Parameters()})
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
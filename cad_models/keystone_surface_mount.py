@@ -1,7 +1,6 @@
-import typing
-
 from build123d import *
-from common import *
+
+from cad_models.common import *
 
 
 @dataclass
@@ -25,113 +24,204 @@ class Parameters:
     wall_thickness_y: float = KeystoneReceiver.depth()
     wall_thickness_z: float = 5 * MM
 
-
-def cover_builder_fn(p: Parameters):
-    with BuildPart() as builder:
-        # cover
-        inner_height = p.box_height - (p.wall_thickness_y)
-        inner_width = p.box_width - (p.wall_thickness_x * 2)
-        with BuildSketch():
-            with BuildLine():
-                Polyline(
-                    (0, 0),
-                    (p.cover_dovetail_depth + inner_width + p.cover_dovetail_depth, 0),
-                    (p.cover_dovetail_depth + inner_width, -p.wall_thickness_z),
-                    (p.cover_dovetail_depth, -p.wall_thickness_z),
-                    (0, 0),
+    @property
+    def inner_height(self):
+        return self.box_height - (self.wall_thickness_y * 2)
+
+    @property
+    def inner_width(self):
+        return self.box_width - (self.wall_thickness_x * 2)
+
+    def validate(self):
+        if self.insert_width > self.inner_width:
+            raise ValueError(
+                f"insert is {self.insert_width:.1f}mm wide, the box only fits "
+                f"{self.inner_width:.1f}mm"
+            )
+        if max(self.insert_height, self.screw_vertical_spacing) > self.inner_height:
+            raise ValueError(
+                f"insert and screws need {self.insert_height:.1f}mm and "
+                f"{self.screw_vertical_spacing:.1f}mm, the box only fits "
+                f"{self.inner_height:.1f}mm"
+            )
+        if KeystoneReceiver.width() > self.box_depth - self.wall_thickness_z:
+            raise ValueError(
+                f"keystones are {KeystoneReceiver.width():.1f}mm wide, the box is "
+                f"only {self.box_depth - self.wall_thickness_z:.1f}mm deep"
+            )
+        walls = [
+            ("left", self.keystone_left_count, self.inner_height),
+            ("right", self.keystone_right_count, self.inner_height),
+            ("bottom", self.keystone_bottom_count, self.inner_width),
+            ("top", self.keystone_top_count, self.inner_width),
+        ]
+        spacing = KeystoneReceiver.height() + self.keystone_spacing
+        for wall, count, length in walls:
+            if count < 0:
+                raise ValueError(f"invalid {wall} keystone count: {count}")
+            needed = (spacing * count) - self.keystone_spacing
+            if count and needed > length:
+                raise ValueError(
+                    f"{count} {wall} keystones need {needed:.1f}mm, the wall only "
+                    f"fits {length:.1f}mm"
                 )
-            make_face()
-        extrude(amount=inner_height)
 
-        # fillet
-        edges = builder.edges().filter_by(Axis.Z).sort_by(Axis.X)
-        edges = [edges[0], edges[-1]]
-        fillet(edges, p.cover_fillet_radius)
 
-        # joint
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        joint_location = Location(face.location_at(0.5, 0.0).position, (0, 0, 0))
-        RigidJoint("joint", builder.part, joint_location)
+def cover_builder_fn(p: Parameters):
+    with BuildPart() as builder:
+        with stage("cover", builder):
+            inner_height = p.box_height - (p.wall_thickness_y)
+            inner_width = p.box_width - (p.wall_thickness_x * 2)
+            with BuildSketch():
+                with BuildLine():
+                    Polyline(
+                        (0, 0),
+                        (
+                            p.cover_dovetail_depth
+                            + inner_width
+                            + p.cover_dovetail_depth,
+                            0,
+                        ),
+                        (p.cover_dovetail_depth + inner_width, -p.wall_thickness_z),
+                        (p.cover_dovetail_depth, -p.wall_thickness_z),
+                        (0, 0),
+                    )
+                make_face()
+            extrude(amount=inner_height)
+
+        if not is_draft():
+            with stage("fillet", builder):
+                edges = select_edges(builder, Axis.Z, Axis.X)
+                edges = [edges[0], edges[-1]]
+                fillet(edges, p.cover_fillet_radius)
+
+        with stage("joint", builder):
+            joint_location = get_cover_joint_location(require(builder.part))
+            RigidJoint("joint", builder.part, joint_location)
     return builder
 
 
-def box_builder_fn(p: Parameters):
-    with BuildPart(mode=Mode.PRIVATE):
-        cover = require(cover_builder_fn(p).part)
+def get_cover_joint_location(cover: Part) -> Location:
+    # derived from geometry - cached parts don't carry their joints
+    face = cover.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
+    return Location(face.location_at(0.5, 0.0).position, (0, 0, 0))
 
+
+def build_box(p: Parameters) -> Part:
     with BuildPart() as builder:
-        # box
         with BuildSketch(Plane.XZ):
             Rectangle(p.box_width, p.box_height)
         extrude(amount=p.box_depth)
+    return require(builder.part)
+
 
-        # shell
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
+def shell_box(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Y)[0]
         inner_depth = p.box_depth - (p.wall_thickness_z)
         inner_height = p.box_height - (p.wall_thickness_y * 2)
         inner_width = p.box_width - (p.wall_thickness_x * 2)
         with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
             Rectangle(inner_width, inner_height)
         extrude(amount=-inner_depth, mode=Mode.SUBTRACT)
+    return require(builder.part)
+
 
-        # cover slot
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
+def cut_cover_slot(p: Parameters, part: Part, cover: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Z)[-1]
         joint_location = Location(face.location_at(0.5, 0.0).position, (0, 0, 0))
-        joint = RigidJoint("cover", builder.part, joint_location)
-        joint.connect_to(typing.cast(RigidJoint, cover.joints["joint"]))
-        add(cover, mode=Mode.SUBTRACT)
+        # the cover is shared with the cover output - place a copy rather than
+        # connecting (moving) it
+        cover_location = joint_location * get_cover_joint_location(cover).inverse()
+        add(place(cover, cover_location), mode=Mode.SUBTRACT)
+    return require(builder.part)
 
-        # insert hole
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[-2]
+
+def cut_insert_hole(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Y)[-2]
         with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
             Rectangle(p.insert_width, p.insert_height)
         extrude(amount=-p.wall_thickness_z, mode=Mode.SUBTRACT)
+    return require(builder.part)
+
 
-        # screw holes
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[-2]
+def cut_screw_holes(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Y)[-2]
         with Locations(Plane(face, x_dir=(1, 0, 0))):
             with GridLocations(0, p.screw_vertical_spacing, 1, 2):
-                CounterSinkHole(
-                    p.screw_diameter / 2, p.screw_head_diameter / 2, p.wall_thickness_z
+                hole = counter_sink_hole(
+                    p.screw_diameter / 2,
+                    p.screw_head_diameter / 2,
+                    p.wall_thickness_z,
                 )
+                add(hole, mode=Mode.SUBTRACT)
+    return require(builder.part)
+
 
-        # keystone receiver cutouts
-        spacing = KeystoneReceiver.height() + p.keystone_spacing
-        keystone_locations: list[Location] = []
-
-        def cut_keystones(
-            count: int, axis: Axis, sort_index: int, x_dir: tuple, wall: float
-        ):
-            if not count:
-                return
-            face = builder.faces().filter_by(axis).sort_by(axis)[sort_index]
-            with BuildSketch(Plane(face, x_dir=x_dir)) as sketch:
-                with GridLocations(0, spacing, 1, count) as grid_locs:
-                    Rectangle(KeystoneReceiver.width(), KeystoneReceiver.height())
-                    for location in grid_locs.locations:
-                        keystone_location = location * Rot(X=-90)
-                        keystone_locations.append(keystone_location)
-            extrude(sketch.sketch, amount=-wall, mode=Mode.SUBTRACT)
-
-        cut_keystones(p.keystone_left_count, Axis.X, 0, (0, -1, 0), p.wall_thickness_x)
-        cut_keystones(p.keystone_right_count, Axis.X, -1, (0, 1, 0), p.wall_thickness_x)
-        cut_keystones(
-            p.keystone_bottom_count, Axis.Z, 0, (0, -1, 0), p.wall_thickness_y
-        )
-        cut_keystones(p.keystone_top_count, Axis.Z, -1, (0, 1, 0), p.wall_thickness_y)
-
-        # keystone receivers
-        for index, joint_location in enumerate(keystone_locations):
-            with BuildPart(mode=Mode.PRIVATE):
-                receiver = KeystoneReceiver()
-            receiver_joint = typing.cast(RigidJoint, receiver.joints["joint"])
-            joint = RigidJoint(f"keystone-{index}", builder.part, joint_location)
-            joint.connect_to(receiver_joint)
-            add(receiver)
+@depends_on(cover=cover_builder_fn)
+def box_builder_fn(p: Parameters, cover: Part):
+    with BuildPart() as builder:
+        with stage("box", builder) as s:
+            s.checkpoint(build_box, p)
+
+        with stage("shell", builder) as s:
+            s.checkpoint(shell_box, p)
+
+        with stage("cover slot", builder) as s:
+            s.checkpoint(cut_cover_slot, p, cover=cover)
+
+        with stage("insert hole", builder) as s:
+            s.checkpoint(cut_insert_hole, p)
+
+        with stage("screw holes", builder) as s:
+            s.checkpoint(cut_screw_holes, p)
+
+        # not checkpointed - the receivers need the locations the cutouts collect
+        with stage("keystone receiver cutouts", builder):
+            spacing = KeystoneReceiver.height() + p.keystone_spacing
+            keystone_locations: list[Location] = []
+
+            def cut_keystones(
+                count: int, axis: Axis, sort_index: int, x_dir: tuple, wall: float
+            ):
+                if not count:
+                    return
+                face = select_faces(builder, axis)[sort_index]
+                with BuildSketch(Plane(face, x_dir=x_dir)) as sketch:
+                    with GridLocations(0, spacing, 1, count) as grid_locs:
+                        Rectangle(KeystoneReceiver.width(), KeystoneReceiver.height())
+                        for location in grid_locs.locations:
+                            keystone_location = location * Rot(X=-90)
+                            keystone_locations.append(keystone_location)
+                extrude(sketch.sketch, amount=-wall, mode=Mode.SUBTRACT)
+
+            cut_keystones(
+                p.keystone_left_count, Axis.X, 0, (0, -1, 0), p.wall_thickness_x
+            )
+            cut_keystones(
+                p.keystone_right_count, Axis.X, -1, (0, 1, 0), p.wall_thickness_x
+            )
+            cut_keystones(
+                p.keystone_bottom_count, Axis.Z, 0, (0, -1, 0), p.wall_thickness_y
+            )
+            cut_keystones(
+                p.keystone_top_count, Axis.Z, -1, (0, 1, 0), p.wall_thickness_y
+            )
+
+        with stage("keystone receivers", builder):
+            if keystone_locations:
+                add(KeystoneReceiver.instances(keystone_locations))
     return builder
 
 
-main(
+model = Model(
     [box_builder_fn, cover_builder_fn],
     {
         "interior-wall": Parameters(keystone_right_count=4),
@@ -140,3 +230,7 @@ main(
         ),
     },
 )
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
@@ -0,0 +1,90 @@
+import contextlib
+import os
+import pathlib
+import resource
+import sys
+import threading
+import typing
+
+
+def get_rss() -> int | None:
+    # current resident set size in bytes - only available on linux
+    try:
+        pages = int(pathlib.Path("/proc/self/statm").read_text().split()[1])
+    except (FileNotFoundError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_peak_rss() -> int:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macos, kilobytes elsewhere
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def parse_bytes(value: str) -> int:
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    value = value.strip().upper().removesuffix("B").removesuffix("I")
+    unit = value[-1:] if value[-1:] in units else ""
+    try:
+        return int(float(value.removesuffix(unit)) * units[unit])
+    except ValueError:
+        raise ValueError(f"invalid size: {value}") from None
+
+
+def format_bytes(value: int | None) -> str:
+    if value is None:
+        return "-"
+    return f"{value / (1024 * 1024):.1f}MB"
+
+
+class MemoryBudgetError(MemoryError):
+    pass
+
+
+# set by run_variant_job from --max-memory - the budget is what a job adds to the
+# resident memory of the process it starts in (OCCT, warm caches and assets aren't
+# counted against it)
+memory_budget: int | None = None
+memory_baseline = 0
+# the most a job added, as sampled by memory_watchdog between stage boundaries
+memory_peak = 0
+
+
+def get_memory_usage() -> int:
+    return (get_rss() or get_peak_rss()) - memory_baseline
+
+
+def check_memory_budget():
+    if memory_budget is None:
+        return
+    usage = max(memory_peak, get_memory_usage())
+    if usage > memory_budget:
+        budget = format_bytes(memory_budget)
+        raise MemoryBudgetError(
+            f"memory budget exceeded: {format_bytes(usage)} > {budget}"
+        )
+
+
+@contextlib.contextmanager
+def memory_watchdog(interval: float = 0.1) -> typing.Iterator[None]:
+    # OCCT operations can't be interrupted, so a single boolean can go over the budget
+    # and back before the next stage boundary checks it - sample the peak meanwhile,
+    # so that the boundary (or the end of the job) raises MemoryBudgetError
+    global memory_peak
+
+    stop = threading.Event()
+    memory_peak = 0
+
+    def watch():
+        global memory_peak
+        while not stop.wait(interval):
+            memory_peak = max(memory_peak, get_memory_usage())
+
+    thread = threading.Thread(target=watch, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
@@ -34,6 +34,30 @@ class Parameters:
     def __post_init__(self):
         self.device.p = self
 
+    def validate(self):
+        if self.tray_width > self.mount_width:
+            raise ValueError(
+                f"tray is {self.tray_width:.1f}mm wide, the mount is only "
+                f"{self.mount_width:.1f}mm"
+            )
+        if self.taper_width <= 0:
+            raise ValueError(
+                f"tray is {self.tray_width:.1f}mm wide, which does not overhang a "
+                f"{self.rack_width:.1f}mm rack - use rack_shelf instead"
+            )
+        taper_depth = (self.oversize_taper_offset * 2) + self.oversize_taper_length
+        if self.tray_depth <= taper_depth:
+            raise ValueError(
+                f"tray is {self.tray_depth:.1f}mm deep, the oversize taper needs "
+                f"more than {taper_depth:.1f}mm"
+            )
+        if self.mount_thickness <= 0:
+            raise ValueError(f"invalid mount thickness: {self.mount_thickness}")
+        if self.hex_radius <= 0 or self.hex_spacing < 0:
+            raise ValueError(
+                f"invalid hex grid: radius {self.hex_radius}, spacing {self.hex_spacing}"
+            )
+
     @property
     def inner_width(self):
         return self.mount_width - (self.ear_width * 2)
@@ -94,56 +118,60 @@ class RB4011(Device):
 
     def tray(self) -> Part:
         with BuildPart(mode=Mode.PRIVATE) as builder:
-            # outer tray
-            with BuildSketch():
-                Rectangle(self.width, self.depth)
-            extrude(amount=self.p.mount_thickness)
-
-            # inner tray
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                location = Location((0, 0))
-                location *= Pos(Y=self.p.oversize_taper_offset / 2)
-                with Locations(location):
-                    Rectangle(self.device_width, self.device_depth)
-            extrude(amount=-self.tray_lip, mode=Mode.SUBTRACT)
-
-            # hex grid
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                add(
-                    hex_grid(
-                        self.device_width,
-                        self.device_depth,
-                        self.p.hex_radius,
-                        self.p.hex_spacing,
-                    )
-                )
-            extrude(amount=-self.p.mount_thickness, mode=Mode.SUBTRACT)
-
-            # feet
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                location = Location((0, 0))
-                location *= Pos(Y=self.foot_offset_y)
-                with Locations(location):
-                    with GridLocations(self.foot_spacing_x, self.foot_spacing_y, 2, 2):
-                        Circle(self.foot_outer_diameter / 2)
-            extrude(amount=-self.tray_inner_thickness)
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                location = Location((0, 0))
-                location *= Pos(Y=self.foot_offset_y)
-                with Locations(location):
-                    with GridLocations(self.foot_spacing_x, self.foot_spacing_y, 2, 2):
-                        Circle(self.foot_diameter / 2)
-            extrude(amount=-self.foot_depth, mode=Mode.SUBTRACT)
-
-            # joint
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[0]
-            edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
-            location = Location(edge.position_at(0.5))
-            RigidJoint("tray", joint_location=location)
+            with stage("outer tray", builder):
+                with BuildSketch():
+                    Rectangle(self.width, self.depth)
+                extrude(amount=self.p.mount_thickness)
+
+            with stage("inner tray", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                    location = Location((0, 0))
+                    location *= Pos(Y=self.p.oversize_taper_offset / 2)
+                    with Locations(location):
+                        Rectangle(self.device_width, self.device_depth)
+                extrude(amount=-self.tray_lip, mode=Mode.SUBTRACT)
+
+            if not is_draft():
+                with stage("hex grid", builder):
+                    face = select_faces(builder, Axis.Z)[1]
+                    with Locations(Plane(face, x_dir=(1, 0, 0))):
+                        grid = hex_grid(
+                            self.device_width,
+                            self.device_depth,
+                            self.p.hex_radius,
+                            self.p.hex_spacing,
+                            self.p.mount_thickness,
+                        )
+                        add(grid, mode=Mode.SUBTRACT)
+
+            with stage("feet", builder):
+                face = select_faces(builder, Axis.Z)[1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    location = Location((0, 0))
+                    location *= Pos(Y=self.foot_offset_y)
+                    with Locations(location):
+                        with GridLocations(
+                            self.foot_spacing_x, self.foot_spacing_y, 2, 2
+                        ):
+                            Circle(self.foot_outer_diameter / 2)
+                extrude(amount=-self.tray_inner_thickness)
+                face = select_faces(builder, Axis.Z)[1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    location = Location((0, 0))
+                    location *= Pos(Y=self.foot_offset_y)
+                    with Locations(location):
+                        with GridLocations(
+                            self.foot_spacing_x, self.foot_spacing_y, 2, 2
+                        ):
+                            Circle(self.foot_diameter / 2)
+                extrude(amount=-self.foot_depth, mode=Mode.SUBTRACT)
+
+            with stage("joint", builder):
+                face = select_faces(builder, Axis.Z)[0]
+                edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
+                location = Location(edge.position_at(0.5))
+                RigidJoint("tray", joint_location=location)
         return require(builder.part)
 
     def panel(self) -> Sketch:
@@ -163,118 +191,126 @@ def get_tray_cutout(part: Part) -> Face:
 
 def builder_fn(p: Parameters):
     with BuildPart() as builder:
-        # front panel
-        with BuildSketch(Plane.XZ):
-            Rectangle(p.mount_width, p.mount_height)
-        extrude(amount=p.mount_thickness)
-
-        # tray
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[-1]
-        with BuildSketch(Plane(face.without_holes(), x_dir=(-1, 0, 0))):
-            location = Location((0, 0))
-            location *= Pos(X=-(p.tray_width) / 2)
-            location *= Pos(Y=-p.mount_height / 2)
-            with Locations(location):
-                Rectangle(
-                    p.tray_width / 2, p.mount_thickness, align=(Align.MIN, Align.MIN)
-                )
-                Rectangle(p.mount_thickness, p.mount_height, align=(Align.MIN))
-            location *= Pos(Y=p.mount_height)
-            with Locations(location):
-                Rectangle(
-                    p.oversize_top_width / 2,
-                    p.mount_thickness,
-                    align=(Align.MIN, Align.MAX),
-                )
-            mirror(about=Plane.YZ)
-        extrude(amount=p.tray_depth)
-
-        # tray rib via subtraction
-        face = builder.faces().filter_by(Axis.X).sort_by(Axis.X)[1]
-        mirror_plane = Plane(face.offset(-p.tray_width / 2))
-        rib_thickness = p.oversize_top_width
-        with BuildSketch(Plane(face, x_dir=(0, -1, 0))):
-            rib_width = p.tray_depth - (
-                (p.oversize_taper_offset * 2) + p.oversize_taper_length
-            )
-            rib_height = p.mount_height - p.mount_thickness
-            location = Location((0, 0))
-            location *= Pos(Y=p.mount_height / 2)
-            location *= Pos(X=p.tray_depth / 2)
-            location *= Pos(
-                X=-((p.oversize_taper_offset * 2) + p.oversize_taper_length)
-            )
-            with Locations(location):
-                Triangle(
-                    C=90,
-                    a=rib_width,
-                    b=rib_height,
-                    align=(Align.MIN, Align.MIN),
-                    rotation=180,
-                )
-        extruded = extrude(amount=-rib_thickness, mode=Mode.SUBTRACT)
-        mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
-
-        # device trays
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[1]
-        location = Location(face.position_at(0.5, 1.0))
-        location *= Pos(Z=-p.mount_thickness)
-        location *= Pos(Y=-p.mount_thickness)
-        part = p.device.tray()
-        part_joint = typing.cast(RigidJoint, part.joints["tray"])
-        tray_joint = RigidJoint(f"device", joint_location=location)
-        tray_joint.connect_to(part_joint)
-        extrude(get_tray_cutout(part), amount=p.mount_thickness, mode=Mode.SUBTRACT)
-        add(part)
-
-        # oversize tray cutouts
-        face = builder.faces().filter_by(Axis.X).sort_by(Axis.X)[1]
-        mirror_plane = Plane(face.offset(-p.tray_width / 2))
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-        edge = face.edges().filter_by(Axis.Y).sort_by(Axis.X)[1]
-        location = edge.location_at(1.0)
-        with BuildSketch(
-            Plane(location.position, x_dir=(0, -1, 0), z_dir=face.normal_at())
-        ):
-            location = Location((0, 0))
-            with Locations(location):
-                Rectangle(
-                    p.oversize_taper_offset, p.taper_width, align=(Align.MAX, Align.MIN)
+        with stage("front panel", builder):
+            with BuildSketch(Plane.XZ):
+                Rectangle(p.mount_width, p.mount_height)
+            extrude(amount=p.mount_thickness)
+
+        with stage("tray", builder):
+            face = select_faces(builder, Axis.Y)[-1]
+            with BuildSketch(Plane(face.without_holes(), x_dir=(-1, 0, 0))):
+                location = Location((0, 0))
+                location *= Pos(X=-(p.tray_width) / 2)
+                location *= Pos(Y=-p.mount_height / 2)
+                with Locations(location):
+                    Rectangle(
+                        p.tray_width / 2,
+                        p.mount_thickness,
+                        align=(Align.MIN, Align.MIN),
+                    )
+                    Rectangle(p.mount_thickness, p.mount_height, align=(Align.MIN))
+                location *= Pos(Y=p.mount_height)
+                with Locations(location):
+                    Rectangle(
+                        p.oversize_top_width / 2,
+                        p.mount_thickness,
+                        align=(Align.MIN, Align.MAX),
+                    )
+                mirror(about=Plane.YZ)
+            extrude(amount=p.tray_depth)
+
+        with stage("tray rib via subtraction", builder):
+            face = select_faces(builder, Axis.X)[1]
+            mirror_plane = Plane(face.offset(-p.tray_width / 2))
+            rib_thickness = p.oversize_top_width
+            with BuildSketch(Plane(face, x_dir=(0, -1, 0))):
+                rib_width = p.tray_depth - (
+                    (p.oversize_taper_offset * 2) + p.oversize_taper_length
                 )
-            location = Location((0, 0))
-            location *= Pos(X=-p.oversize_taper_offset)
-            with Locations(location):
-                Triangle(
-                    C=90,
-                    a=p.oversize_taper_length,
-                    b=p.taper_width,
-                    align=(Align.MAX, Align.MIN),
+                rib_height = p.mount_height - p.mount_thickness
+                location = Location((0, 0))
+                location *= Pos(Y=p.mount_height / 2)
+                location *= Pos(X=p.tray_depth / 2)
+                location *= Pos(
+                    X=-((p.oversize_taper_offset * 2) + p.oversize_taper_length)
                 )
-        extruded = extrude(amount=-p.mount_height, mode=Mode.SUBTRACT)
-        mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
-
-        # ear holes
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-            location = Location((0, 0))
-            location *= Pos(X=-(p.inner_width + p.ear_width) / 2)
-            with Locations(location):
-                vertical_spacing = p.mount_height - (0.5 * IN)
-                with GridLocations(0, vertical_spacing, 1, 2):
-                    SlotOverall(p.ear_hole_width, p.ear_hole_height)
-            mirror(about=Plane.YZ)
-        extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
-
-        # front panel cutout
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        location = Location(face.without_holes().position_at(0.5, 1.0))
-        location *= Pos(Z=p.mount_thickness)
-        plane = Plane(location.position, x_dir=(1, 0, 0), z_dir=face.normal_at())
-        with BuildSketch(plane) as sketch:
-            cutout = p.device.panel()
-            add(cutout)
-        extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
+                with Locations(location):
+                    Triangle(
+                        C=90,
+                        a=rib_width,
+                        b=rib_height,
+                        align=(Align.MIN, Align.MIN),
+                        rotation=180,
+                    )
+            extruded = extrude(amount=-rib_thickness, mode=Mode.SUBTRACT)
+            mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
+
+        with stage("device trays", builder):
+            face = select_faces(builder, Axis.Z)[1]
+            location = Location(face.position_at(0.5, 1.0))
+            location *= Pos(Z=-p.mount_thickness)
+            location *= Pos(Y=-p.mount_thickness)
+            part = p.device.tray()
+            part_joint = typing.cast(RigidJoint, part.joints["tray"])
+            tray_joint = RigidJoint(f"device", joint_location=location)
+            tray_joint.connect_to(part_joint)
+            extrude(get_tray_cutout(part), amount=p.mount_thickness, mode=Mode.SUBTRACT)
+            add(part)
+
+        with stage("oversize tray cutouts", builder):
+            face = select_faces(builder, Axis.X)[1]
+            mirror_plane = Plane(face.offset(-p.tray_width / 2))
+            face = select_faces(builder, Axis.Z)[-1]
+            edge = face.edges().filter_by(Axis.Y).sort_by(Axis.X)[1]
+            location = edge.location_at(1.0)
+            with BuildSketch(
+                Plane(location.position, x_dir=(0, -1, 0), z_dir=face.normal_at())
+            ):
+                location = Location((0, 0))
+                with Locations(location):
+                    Rectangle(
+                        p.oversize_taper_offset,
+                        p.taper_width,
+                        align=(Align.MAX, Align.MIN),
+                    )
+                location = Location((0, 0))
+                location *= Pos(X=-p.oversize_taper_offset)
+                with Locations(location):
+                    Triangle(
+                        C=90,
+                        a=p.oversize_taper_length,
+                        b=p.taper_width,
+                        align=(Align.MAX, Align.MIN),
+                    )
+            extruded = extrude(amount=-p.mount_height, mode=Mode.SUBTRACT)
+            mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
+
+        with stage("ear holes", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                location = Location((0, 0))
+                location *= Pos(X=-(p.inner_width + p.ear_width) / 2)
+                with Locations(location):
+                    vertical_spacing = p.mount_height - (0.5 * IN)
+                    with GridLocations(0, vertical_spacing, 1, 2):
+                        SlotOverall(p.ear_hole_width, p.ear_hole_height)
+                mirror(about=Plane.YZ)
+            extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
+
+        with stage("front panel cutout", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            location = Location(face.without_holes().position_at(0.5, 1.0))
+            location *= Pos(Z=p.mount_thickness)
+            plane = Plane(location.position, x_dir=(1, 0, 0), z_dir=face.normal_at())
+            with BuildSketch(plane) as sketch:
+                cutout = p.device.panel()
+                add(cutout)
+            extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
     return builder
 
 
-main(builder_fn, {"rb4011": Parameters(device=RB4011())})
+model = Model([builder_fn], {"rb4011": Parameters(device=RB4011())})
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
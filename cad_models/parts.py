@@ -0,0 +1,100 @@
+import inspect
+import pathlib
+import typing
+
+from build123d import MM, Shape, pack
+
+from cad_models import checkpoints, common, selectors
+from cad_models.cache import DiskCache, hash_bytes, hash_file, read_brep, write_brep
+from cad_models.checkpoints import stage
+from cad_models.common import BuildPartFn, TParameter, get_dependencies, require
+from cad_models.data import folder as data_folder
+from cad_models.keys import fingerprint, get_code, get_dependency_fingerprint
+
+# the shared code a part's geometry comes from
+geometry_modules = [common, checkpoints, selectors]
+
+
+part_cache = DiskCache("parts", ".bbrep", max_bytes=1024 * 1024 * 1024)
+
+
+def get_source_key(build_part_fn: BuildPartFn) -> str:
+    # everything a part depends on besides its parameters
+    path = pathlib.Path(inspect.getfile(build_part_fn))
+    data_files = sorted(data_folder.glob("*.step"))
+    return hash_bytes(
+        *(pathlib.Path(m.__file__).read_bytes() for m in geometry_modules),
+        get_code(path.read_text()).encode(),
+        *(hash_file(f).encode() for f in data_files),
+        build_part_fn.__qualname__.encode(),
+        common.fidelity.encode(),
+        f"limit_hex_grid={common.limit_hex_grid}".encode(),
+        get_dependency_fingerprint().encode(),
+    )
+
+
+def get_part_key(build_part_fn: BuildPartFn[TParameter], parameters: TParameter) -> str:
+    return hash_bytes(
+        get_source_key(build_part_fn).encode(), fingerprint(parameters).encode()
+    )
+
+
+def build_part(
+    build_part_fn: BuildPartFn[TParameter],
+    parameters: TParameter,
+    cache: bool = True,
+    parts: dict[typing.Any, Shape] | None = None,
+) -> Shape:
+    # parts is the per-run memo - dependencies are only built (once) when a part that
+    # needs them isn't cached
+    parts = {} if parts is None else parts
+    if build_part_fn in parts:
+        return parts[build_part_fn]
+
+    def build() -> Shape:
+        dependencies = {
+            name: build_part(dependency, parameters, cache=cache, parts=parts)
+            for name, dependency in get_dependencies(build_part_fn).items()
+        }
+        previous_key = checkpoints.checkpoint_key
+        checkpoints.checkpoint_key = get_source_key(build_part_fn) if cache else None
+        try:
+            return require(build_part_fn(parameters, **dependencies).part)
+        finally:
+            checkpoints.checkpoint_key = previous_key
+
+    with stage(build_part_fn.__name__):
+        key = get_part_key(build_part_fn, parameters) if cache else None
+        cached = part_cache.get(key) if key else None
+        if cached:
+            part = read_brep(cached)
+        elif key:
+            part = build()
+            with part_cache.put(key) as path:
+                write_brep(part, path)
+        else:
+            part = build()
+    parts[build_part_fn] = part
+    return part
+
+
+def validate_parameters(parameters: typing.Any):
+    # parameters may define validate(), raising ValueError for configurations that
+    # can't be built - it only does arithmetic, so it runs before any geometry work
+    validate = getattr(parameters, "validate", None)
+    if validate:
+        validate()
+
+
+def build_variant(
+    build_part_fns: list[BuildPartFn[TParameter]],
+    parameters: TParameter,
+    cache: bool = True,
+) -> list[Shape]:
+    validate_parameters(parameters)
+    built: dict[typing.Any, Shape] = {}
+    parts = [
+        build_part(build_part_fn, parameters, cache=cache, parts=built)
+        for build_part_fn in build_part_fns
+    ]
+    return list(pack(parts, 5 * MM, align_z=True))
@@ -56,45 +56,51 @@ class Gigaplus(Device):
                     self.hole_count,
                     self.hole_count,
                 ):
-                    CounterSinkHole(
+                    hole = counter_sink_hole(
                         self.screw_diameter / 2,
                         self.screw_head_diameter / 2,
                         self.interface_width,
-                        mode=Mode.ADD,
                     )
+                    add(hole)
         return require(builder.part)
 
 
 def builder_fn(p: Parameters):
     with BuildPart() as builder:
-        # bracket
-        with BuildSketch():
-            Rectangle(p.bracket_width, p.ear_thickness, align=(Align.MAX, Align.MIN))
-            Rectangle(
-                p.device.interface_width,
-                p.device.bracket_depth,
-                align=(Align.MAX, Align.MIN),
-            )
-        extrude(amount=p.bracket_height)
-
-        # ear holes
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-            location = Location((0, 0))
-            location *= Pos(X=-p.bracket_width / 2)
-            location *= Pos(X=p.ear_width / 2)
-            with Locations(location):
-                vertical_spacing = p.bracket_height - (0.5 * IN)
-                with GridLocations(0, vertical_spacing, 1, 2):
-                    SlotOverall(p.ear_hole_width, p.ear_hole_height)
-        extrude(amount=-p.ear_thickness, mode=Mode.SUBTRACT)
-
-        # bracket-device interface
-        face = builder.faces().filter_by(Axis.X).sort_by(Axis.X)[1]
-        with Locations(Plane(face, x_dir=(0, 1, 0))):
-            interface = p.device.interface()
-            add(interface, mode=Mode.SUBTRACT)
+        with stage("bracket", builder):
+            with BuildSketch():
+                Rectangle(
+                    p.bracket_width, p.ear_thickness, align=(Align.MAX, Align.MIN)
+                )
+                Rectangle(
+                    p.device.interface_width,
+                    p.device.bracket_depth,
+                    align=(Align.MAX, Align.MIN),
+                )
+            extrude(amount=p.bracket_height)
+
+        with stage("ear holes", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                location = Location((0, 0))
+                location *= Pos(X=-p.bracket_width / 2)
+                location *= Pos(X=p.ear_width / 2)
+                with Locations(location):
+                    vertical_spacing = p.bracket_height - (0.5 * IN)
+                    with GridLocations(0, vertical_spacing, 1, 2):
+                        SlotOverall(p.ear_hole_width, p.ear_hole_height)
+            extrude(amount=-p.ear_thickness, mode=Mode.SUBTRACT)
+
+        with stage("bracket-device interface", builder):
+            face = select_faces(builder, Axis.X)[1]
+            with Locations(Plane(face, x_dir=(0, 1, 0))):
+                interface = p.device.interface()
+                add(interface, mode=Mode.SUBTRACT)
     return builder
 
 
-main(builder_fn, {"gigaplus": Parameters(device=Gigaplus())})
+model = Model([builder_fn], {"gigaplus": Parameters(device=Gigaplus())})
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
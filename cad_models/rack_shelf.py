@@ -8,10 +8,18 @@ class Device:
     width: float
     depth: float
 
+    @memoize_device
     def tray(self) -> Part:
-        raise NotImplementedError()
+        return self.build_tray()
 
+    @memoize_device
     def panel(self) -> Sketch:
+        return self.build_panel()
+
+    def build_tray(self) -> Part:
+        raise NotImplementedError()
+
+    def build_panel(self) -> Sketch:
         raise NotImplementedError()
 
 
@@ -32,6 +40,27 @@ class Parameters:
         for device in self.devices:
             device.p = self
 
+    def validate(self):
+        if not self.devices:
+            raise ValueError("no devices")
+        if self.mount_width < self.rack_width + (self.ear_width * 2):
+            raise ValueError(
+                f"mount width {self.mount_width:.1f}mm leaves no room for "
+                f"{self.ear_width:.1f}mm ears on a {self.rack_width:.1f}mm rack"
+            )
+        if self.device_spacing < 0:
+            devices_width = sum(d.width for d in self.devices)
+            raise ValueError(
+                f"devices are {devices_width:.1f}mm wide, the tray only fits "
+                f"{self.tray_inner_width:.1f}mm"
+            )
+        if self.mount_thickness <= 0:
+            raise ValueError(f"invalid mount thickness: {self.mount_thickness}")
+        if self.hex_radius <= 0 or self.hex_spacing < 0:
+            raise ValueError(
+                f"invalid hex grid: radius {self.hex_radius}, spacing {self.hex_spacing}"
+            )
+
     @property
     def device_spacing(self):
         return (self.tray_inner_width - sum(d.width for d in self.devices)) / (
@@ -93,55 +122,55 @@ class RaspberryPi(Device):
     def wall_height(self):
         return self.adapter_height - self.lip
 
-    def tray(self) -> Part:
+    def build_tray(self) -> Part:
         with BuildPart(mode=Mode.PRIVATE) as builder:
-            # outer tray
-            with BuildSketch() as sketch:
-                Rectangle(self.width, self.depth)
-                fillet(sketch.vertices(), radius=self.fillet_radius)
-            extrude(amount=self.height)
-
-            # inner tray
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))) as sketch:
-                Rectangle(self.device_width, self.device_depth)
-                fillet(sketch.vertices(), radius=self.fillet_radius)
-            extrude(amount=-self.adapter_height, mode=Mode.SUBTRACT)
-
-            # wall openings
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                Rectangle(self.width, self.wall_opening_y)
-                Rectangle(self.wall_opening_x, self.depth)
-            extrude(amount=-self.wall_height, mode=Mode.SUBTRACT)
-
-            # hex grid
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                add(
-                    hex_grid(
-                        self.grid_width,
-                        self.grid_height,
-                        self.p.hex_radius,
-                        self.p.hex_spacing,
-                    )
-                )
-            extrude(amount=-self.p.mount_thickness, mode=Mode.SUBTRACT)
-
-            # remove back wall
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Y)[-1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                Rectangle(self.wall_opening_x, self.p.mount_thickness)
-            extrude(amount=-self.lip, mode=Mode.SUBTRACT)
-
-            # joint
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[0]
-            edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
-            location = Location(edge.position_at(0.5))
-            RigidJoint("tray", joint_location=location)
+            with stage("outer tray", builder):
+                with BuildSketch() as sketch:
+                    Rectangle(self.width, self.depth)
+                    fillet(sketch.vertices(), radius=self.fillet_radius)
+                extrude(amount=self.height)
+
+            with stage("inner tray", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face, x_dir=(1, 0, 0))) as sketch:
+                    Rectangle(self.device_width, self.device_depth)
+                    fillet(sketch.vertices(), radius=self.fillet_radius)
+                extrude(amount=-self.adapter_height, mode=Mode.SUBTRACT)
+
+            with stage("wall openings", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    Rectangle(self.width, self.wall_opening_y)
+                    Rectangle(self.wall_opening_x, self.depth)
+                extrude(amount=-self.wall_height, mode=Mode.SUBTRACT)
+
+            if not is_draft():
+                with stage("hex grid", builder):
+                    face = select_faces(builder, Axis.Z)[1]
+                    with Locations(Plane(face, x_dir=(1, 0, 0))):
+                        grid = hex_grid(
+                            self.grid_width,
+                            self.grid_height,
+                            self.p.hex_radius,
+                            self.p.hex_spacing,
+                            self.p.mount_thickness,
+                        )
+                        add(grid, mode=Mode.SUBTRACT)
+
+            with stage("remove back wall", builder):
+                face = select_faces(builder, Axis.Z, Axis.Y)[-1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    Rectangle(self.wall_opening_x, self.p.mount_thickness)
+                extrude(amount=-self.lip, mode=Mode.SUBTRACT)
+
+            with stage("joint", builder):
+                face = select_faces(builder, Axis.Z)[0]
+                edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
+                location = Location(edge.position_at(0.5))
+                RigidJoint("tray", joint_location=location)
         return require(builder.part)
 
-    def panel(self) -> Sketch:
+    def build_panel(self) -> Sketch:
         with BuildSketch(mode=Mode.PRIVATE) as sketch:
             Rectangle(
                 self.panel_opening_width,
@@ -192,60 +221,66 @@ class Thinkcentre(Device):
     def tray_inner_thickness(self):
         return self.p.mount_thickness - self.tray_lip
 
-    def tray(self) -> Part:
+    def build_tray(self) -> Part:
         with BuildPart(mode=Mode.PRIVATE) as builder:
-            # outer tray
-            with BuildSketch():
-                Rectangle(self.width, self.depth)
-            extrude(amount=self.p.mount_thickness)
-
-            # inner tray
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                Rectangle(self.device_width, self.device_depth)
-            extrude(amount=-self.tray_lip, mode=Mode.SUBTRACT)
-
-            # hex grid
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                add(
-                    hex_grid(
-                        self.device_width,
-                        self.device_depth,
-                        self.p.hex_radius,
-                        self.p.hex_spacing,
-                    )
-                )
-            extrude(amount=-self.p.mount_thickness, mode=Mode.SUBTRACT)
-
-            # feet
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                location = Location((0, 0))
-                location *= Pos(Y=self.foot_offset_y)
-                with Locations(location):
-                    with GridLocations(self.foot_spacing_x, self.foot_spacing_y, 2, 2):
-                        SlotOverall(
-                            self.foot_outer_width, self.foot_outer_height, rotation=90
+            with stage("outer tray", builder):
+                with BuildSketch():
+                    Rectangle(self.width, self.depth)
+                extrude(amount=self.p.mount_thickness)
+
+            with stage("inner tray", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                    Rectangle(self.device_width, self.device_depth)
+                extrude(amount=-self.tray_lip, mode=Mode.SUBTRACT)
+
+            if not is_draft():
+                with stage("hex grid", builder):
+                    face = select_faces(builder, Axis.Z)[1]
+                    with Locations(Plane(face, x_dir=(1, 0, 0))):
+                        grid = hex_grid(
+                            self.device_width,
+                            self.device_depth,
+                            self.p.hex_radius,
+                            self.p.hex_spacing,
+                            self.p.mount_thickness,
                         )
-            extrude(amount=-self.tray_inner_thickness)
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                location = Location((0, 0))
-                location *= Pos(Y=self.foot_offset_y)
-                with Locations(location):
-                    with GridLocations(self.foot_spacing_x, self.foot_spacing_y, 2, 2):
-                        SlotOverall(self.foot_width, self.foot_height, rotation=90)
-            extrude(amount=-self.foot_depth, mode=Mode.SUBTRACT)
-
-            # joint
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[0]
-            edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
-            location = Location(edge.position_at(0.5))
-            RigidJoint("tray", joint_location=location)
+                        add(grid, mode=Mode.SUBTRACT)
+
+            with stage("feet", builder):
+                face = select_faces(builder, Axis.Z)[1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    location = Location((0, 0))
+                    location *= Pos(Y=self.foot_offset_y)
+                    with Locations(location):
+                        with GridLocations(
+                            self.foot_spacing_x, self.foot_spacing_y, 2, 2
+                        ):
+                            SlotOverall(
+                                self.foot_outer_width,
+                                self.foot_outer_height,
+                                rotation=90,
+                            )
+                extrude(amount=-self.tray_inner_thickness)
+                face = select_faces(builder, Axis.Z)[1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    location = Location((0, 0))
+                    location *= Pos(Y=self.foot_offset_y)
+                    with Locations(location):
+                        with GridLocations(
+                            self.foot_spacing_x, self.foot_spacing_y, 2, 2
+                        ):
+                            SlotOverall(self.foot_width, self.foot_height, rotation=90)
+                extrude(amount=-self.foot_depth, mode=Mode.SUBTRACT)
+
+            with stage("joint", builder):
+                face = select_faces(builder, Axis.Z)[0]
+                edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
+                location = Location(edge.position_at(0.5))
+                RigidJoint("tray", joint_location=location)
         return require(builder.part)
 
-    def panel(self) -> Sketch:
+    def build_panel(self) -> Sketch:
         with BuildSketch(mode=Mode.PRIVATE) as sketch:
             Rectangle(
                 self.panel_opening_width,
@@ -302,49 +337,49 @@ class HueBridge(Device):
     def panel_opening_height(self):
         return self.device_height - self.lip
 
-    def tray(self) -> Part:
+    def build_tray(self) -> Part:
         with BuildPart(mode=Mode.PRIVATE) as builder:
-            # outer tray
-            with BuildSketch() as sketch:
-                Rectangle(self.width, self.depth)
-                fillet(sketch.vertices(), radius=self.outer_fillet_radius)
-            extrude(amount=self.height)
-
-            # inner tray
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))) as sketch:
-                Rectangle(self.device_width, self.device_depth)
-                fillet(sketch.vertices(), radius=self.inner_fillet_radius)
-            extrude(amount=-self.device_height, mode=Mode.SUBTRACT)
-
-            # wall openings
-            face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
-            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-                Rectangle(self.width, self.wall_opening)
-                Rectangle(self.wall_opening, self.depth)
-            extrude(amount=-self.wall_height, mode=Mode.SUBTRACT)
-
-            # hex grid
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[1]
-            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-                add(
-                    hex_grid(
-                        self.grid_width,
-                        self.grid_height,
-                        self.p.hex_radius,
-                        self.p.hex_spacing,
-                    )
-                )
-            extrude(amount=-self.p.mount_thickness, mode=Mode.SUBTRACT)
+            with stage("outer tray", builder):
+                with BuildSketch() as sketch:
+                    Rectangle(self.width, self.depth)
+                    fillet(sketch.vertices(), radius=self.outer_fillet_radius)
+                extrude(amount=self.height)
+
+            with stage("inner tray", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face, x_dir=(1, 0, 0))) as sketch:
+                    Rectangle(self.device_width, self.device_depth)
+                    fillet(sketch.vertices(), radius=self.inner_fillet_radius)
+                extrude(amount=-self.device_height, mode=Mode.SUBTRACT)
+
+            with stage("wall openings", builder):
+                face = select_faces(builder, Axis.Z)[-1]
+                with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                    Rectangle(self.width, self.wall_opening)
+                    Rectangle(self.wall_opening, self.depth)
+                extrude(amount=-self.wall_height, mode=Mode.SUBTRACT)
+
+            if not is_draft():
+                with stage("hex grid", builder):
+                    face = select_faces(builder, Axis.Z)[1]
+                    with Locations(Plane(face, x_dir=(1, 0, 0))):
+                        grid = hex_grid(
+                            self.grid_width,
+                            self.grid_height,
+                            self.p.hex_radius,
+                            self.p.hex_spacing,
+                            self.p.mount_thickness,
+                        )
+                        add(grid, mode=Mode.SUBTRACT)
 
-            # joint
-            face = builder.faces().sort_by(Axis.Z).filter_by(Axis.Z)[0]
-            edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
-            location = Location(edge.position_at(0.5))
-            RigidJoint("tray", joint_location=location)
+            with stage("joint", builder):
+                face = select_faces(builder, Axis.Z)[0]
+                edge = face.edges().filter_by(Axis.X).sort_by(Axis.Y)[0]
+                location = Location(edge.position_at(0.5))
+                RigidJoint("tray", joint_location=location)
         return require(builder.part)
 
-    def panel(self) -> Sketch:
+    def build_panel(self) -> Sketch:
         with BuildSketch(mode=Mode.PRIVATE) as sketch:
             Rectangle(
                 self.panel_opening_width,
@@ -361,93 +396,109 @@ def get_tray_cutout(part: Part) -> Face:
 
 def builder_fn(p: Parameters):
     with BuildPart() as builder:
-        # front panel
-        with BuildSketch(Plane.XZ):
-            Rectangle(p.mount_width, p.mount_height)
-        extrude(amount=p.mount_thickness)
-
-        # ear holes
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-            location = Location((0, 0))
-            location *= Pos(X=-(p.tray_width + p.ear_width) / 2)
-            with Locations(location):
-                vertical_spacing = p.mount_height - (0.5 * IN)
-                with GridLocations(0, vertical_spacing, 1, 2):
-                    SlotOverall(p.ear_hole_width, p.ear_hole_height)
-            mirror(about=Plane.YZ)
-        extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
-
-        # tray
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[-1]
-        with BuildSketch(Plane(face.without_holes(), x_dir=(-1, 0, 0))):
-            location = Location((0, 0))
-            location *= Pos(X=-(p.tray_width) / 2)
-            location *= Pos(Y=-p.mount_height / 2)
-            with Locations(location):
-                Rectangle(
-                    p.tray_width / 2, p.mount_thickness, align=(Align.MIN, Align.MIN)
+        with stage("front panel", builder):
+            with BuildSketch(Plane.XZ):
+                Rectangle(p.mount_width, p.mount_height)
+            extrude(amount=p.mount_thickness)
+
+        with stage("ear holes", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                location = Location((0, 0))
+                location *= Pos(X=-(p.tray_width + p.ear_width) / 2)
+                with Locations(location):
+                    vertical_spacing = p.mount_height - (0.5 * IN)
+                    with GridLocations(0, vertical_spacing, 1, 2):
+                        SlotOverall(p.ear_hole_width, p.ear_hole_height)
+                mirror(about=Plane.YZ)
+            extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
+
+        with stage("tray", builder):
+            face = select_faces(builder, Axis.Y)[-1]
+            with BuildSketch(Plane(face.without_holes(), x_dir=(-1, 0, 0))):
+                location = Location((0, 0))
+                location *= Pos(X=-(p.tray_width) / 2)
+                location *= Pos(Y=-p.mount_height / 2)
+                with Locations(location):
+                    Rectangle(
+                        p.tray_width / 2,
+                        p.mount_thickness,
+                        align=(Align.MIN, Align.MIN),
+                    )
+                    Rectangle(p.mount_thickness, p.mount_height, align=(Align.MIN))
+                mirror(about=Plane.YZ)
+            extrude(amount=p.tray_depth)
+
+        with stage("tray rib via subtraction", builder):
+            face = select_faces(builder, Axis.X)[1]
+            mirror_plane = Plane(face.offset(-p.tray_width / 2))
+            rib_thickness = p.mount_thickness
+            with BuildSketch(Plane(face, x_dir=(0, -1, 0))):
+                rib_width = p.tray_depth
+                rib_height = p.mount_height - p.mount_thickness
+                location = Location((0, 0))
+                location *= Pos(Y=p.mount_height / 2)
+                location *= Pos(X=p.tray_depth / 2)
+                with Locations(location):
+                    Triangle(
+                        C=90,
+                        a=rib_width,
+                        b=rib_height,
+                        align=(Align.MIN, Align.MIN),
+                        rotation=180,
+                    )
+            extruded = extrude(amount=-rib_thickness, mode=Mode.SUBTRACT)
+            mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
+
+        with stage("device trays", builder):
+            face = select_faces(builder, Axis.Z)[3]
+            location = Location(face.position_at(0.0, 1.0))
+            location *= Pos(Z=-p.mount_thickness)
+            location *= Pos(Y=-p.mount_thickness)
+            # (cutouts and trays are each applied as one boolean rather than one per device)
+            tray_cutouts = []
+            trays = []
+            for device in p.devices:
+                location *= Pos(X=p.device_spacing)
+                location *= Pos(X=device.width / 2)
+                part = device.tray()
+                part_joint = typing.cast(RigidJoint, part.joints["tray"])
+                part = place(part, location * part_joint.relative_location.inverse())
+                tray_cutout = extrude(
+                    get_tray_cutout(part), amount=p.mount_thickness, mode=Mode.PRIVATE
                 )
-                Rectangle(p.mount_thickness, p.mount_height, align=(Align.MIN))
-            mirror(about=Plane.YZ)
-        extrude(amount=p.tray_depth)
-
-        # tray rib via subtraction
-        face = builder.faces().filter_by(Axis.X).sort_by(Axis.X)[1]
-        mirror_plane = Plane(face.offset(-p.tray_width / 2))
-        rib_thickness = p.mount_thickness
-        with BuildSketch(Plane(face, x_dir=(0, -1, 0))):
-            rib_width = p.tray_depth
-            rib_height = p.mount_height - p.mount_thickness
-            location = Location((0, 0))
-            location *= Pos(Y=p.mount_height / 2)
-            location *= Pos(X=p.tray_depth / 2)
-            with Locations(location):
-                Triangle(
-                    C=90,
-                    a=rib_width,
-                    b=rib_height,
-                    align=(Align.MIN, Align.MIN),
-                    rotation=180,
+                tray_cutouts.append(tray_cutout)
+                trays.append(part)
+                location *= Pos(X=device.width / 2)
+            add(tray_cutouts, mode=Mode.SUBTRACT)
+            add(trays)
+
+        with stage("front panel cutout", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            location = Location(face.without_holes().position_at(0.5, 1.0))
+            location *= Pos(X=-p.tray_inner_width / 2)
+            location *= Pos(Z=p.mount_thickness)
+            panel_cutouts = []
+            for device in p.devices:
+                location *= Pos(X=p.device_spacing)
+                location *= Pos(X=device.width / 2)
+                plane = Plane(
+                    location.position, x_dir=(1, 0, 0), z_dir=face.normal_at()
                 )
-        extruded = extrude(amount=-rib_thickness, mode=Mode.SUBTRACT)
-        mirror(extruded, about=mirror_plane, mode=Mode.SUBTRACT)
-
-        # device trays
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[3]
-        location = Location(face.position_at(0.0, 1.0))
-        location *= Pos(Z=-p.mount_thickness)
-        location *= Pos(Y=-p.mount_thickness)
-        for index, device in enumerate(p.devices):
-            location *= Pos(X=p.device_spacing)
-            location *= Pos(X=device.width / 2)
-            part = device.tray()
-            part_joint = typing.cast(RigidJoint, part.joints["tray"])
-            tray_joint = RigidJoint(f"device-{index}", joint_location=location)
-            tray_joint.connect_to(part_joint)
-            extrude(get_tray_cutout(part), amount=p.mount_thickness, mode=Mode.SUBTRACT)
-            add(part)
-            location *= Pos(X=device.width / 2)
-
-        # front panel cutout
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        location = Location(face.without_holes().position_at(0.5, 1.0))
-        location *= Pos(X=-p.tray_inner_width / 2)
-        location *= Pos(Z=p.mount_thickness)
-        for device in p.devices:
-            location *= Pos(X=p.device_spacing)
-            location *= Pos(X=device.width / 2)
-            plane = Plane(location.position, x_dir=(1, 0, 0), z_dir=face.normal_at())
-            with BuildSketch(plane):
-                cutout = device.panel()
-                add(cutout)
-            extrude(amount=-p.mount_thickness, mode=Mode.SUBTRACT)
-            location *= Pos(X=device.width / 2)
+                with BuildSketch(plane, mode=Mode.PRIVATE) as sketch:
+                    cutout = device.panel()
+                    add(cutout)
+                panel_cutout = extrude(
+                    sketch.sketch, amount=-p.mount_thickness, mode=Mode.PRIVATE
+                )
+                panel_cutouts.append(panel_cutout)
+                location *= Pos(X=device.width / 2)
+            add(panel_cutouts, mode=Mode.SUBTRACT)
     return builder
 
 
-main(
-    builder_fn,
+model = Model(
+    [builder_fn],
     {
         "hue-bridge": Parameters(devices=[HueBridge()]),
         "thinkcentre": Parameters(devices=[Thinkcentre()]),
@@ -455,3 +506,7 @@ main(
         "two-raspberry-pis": Parameters(devices=[RaspberryPi(), RaspberryPi()]),
     },
 )
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
@@ -0,0 +1,82 @@
+import ast
+import functools
+import importlib
+import pathlib
+import pkgutil
+import typing
+from dataclasses import dataclass
+
+import cad_models
+from cad_models.cli import get_part_name
+
+if typing.TYPE_CHECKING:
+    from cad_models.common import Model
+
+# model modules are read rather than imported, so that listing them does not load
+# OCCT - each declares `model = Model(build_part_fns, {"variant": ..., ...})` at the
+# top level, with a list of build functions and literal variant names
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    module: str
+    variants: list[str]
+    parts: list[str]
+
+
+def get_declared_model(path: pathlib.Path) -> tuple[list[str], list[str]] | None:
+    # the model's (variant names, part names)
+    tree = ast.parse(path.read_text(), filename=str(path))
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or target.id != "model":
+            continue
+        call = node.value
+        if not isinstance(call, ast.Call) or ast.unparse(call.func) != "Model":
+            continue
+        build_part_fns = call.args[0] if call.args else None
+        if not isinstance(build_part_fns, ast.List) or not all(
+            isinstance(fn, ast.Name) for fn in build_part_fns.elts
+        ):
+            raise ValueError(f"model build functions must be a list of names: {path}")
+        parts = [
+            get_part_name(typing.cast(ast.Name, fn).id) for fn in build_part_fns.elts
+        ]
+        variants = call.args[1] if len(call.args) > 1 else None
+        if not isinstance(variants, ast.Dict):
+            raise ValueError(f"model variants must be a dict literal: {path}")
+        names = [ast.literal_eval(typing.cast(ast.expr, key)) for key in variants.keys]
+        return names, parts
+    return None
+
+
+@functools.cache
+def get_models() -> dict[str, ModelInfo]:
+    models = {}
+    folder = pathlib.Path(cad_models.__file__).parent
+    for module_info in pkgutil.iter_modules([str(folder)]):
+        if module_info.name.startswith("_") or module_info.ispkg:
+            continue
+        path = folder.joinpath(f"{module_info.name}.py")
+        declared = get_declared_model(path)
+        if declared is None:
+            continue
+        name = module_info.name
+        models[name] = ModelInfo(name, f"cad_models.{name}", *declared)
+    return models
+
+
+def get_model_info(name: str) -> ModelInfo:
+    models = get_models()
+    info = models.get(name.replace("-", "_"))
+    if info is None:
+        raise ValueError(f"invalid model: {name}")
+    return info
+
+
+def load_model(name: str) -> "Model":
+    module = importlib.import_module(get_model_info(name).module)
+    return module.model
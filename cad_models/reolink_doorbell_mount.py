@@ -1,6 +1,7 @@
 from bd_warehouse.fastener import *
 from build123d import *
-from common import *
+
+from cad_models.common import *
 
 
 @dataclass
@@ -49,58 +50,63 @@ class Parameters:
 
 def builder_fn(p: Parameters):
     with BuildPart() as builder:
-        # mount
-        with BuildSketch(Plane.XZ):
-            SlotOverall(p.mount_height, p.mount_width, rotation=90)
-        extrude(amount=p.mount_depth)
-
-        # holes
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
-            # inner slot
-            SlotOverall(p.inner_slot_height, p.inner_slot_width, rotation=90)
-            # doorbell mount plate
-            with GridLocations(0, p.doorbell_screw_spacing_y, 1, 2):
-                Circle(p.doorbell_screw_diameter / 2)
-            # wall slot
-            with GridLocations(0, p.wall_slot_spacing_y, 1, 2):
-                SlotOverall(
-                    p.wall_slot_inner_height, p.wall_slot_inner_width, rotation=90
-                )
-        extrude(amount=-p.mount_depth, mode=Mode.SUBTRACT)
-
-        # wall outer slot
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-            with GridLocations(0, p.wall_slot_spacing_y, 1, 2):
-                SlotOverall(
-                    p.wall_slot_outer_height, p.wall_slot_outer_width, rotation=90
-                )
-        extrude(amount=-p.wall_slot_outer_depth, mode=Mode.SUBTRACT)
-
-        # doorbell pegs
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[0]
-        with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
-            with GridLocations(
-                p.doorbell_peg_spacing_x, p.doorbell_peg_spacing_y, 2, 2
-            ):
-                Circle(p.doorbell_peg_diameter / 2)
-        extrude(amount=p.doorbell_peg_depth)
-
-        # channel
-        with BuildPart(mode=Mode.PRIVATE) as channel_builder:
-            Box(p.channel_size, p.channel_size, p.mount_height)
-            edges = channel_builder.edges().filter_by(Axis.Z).sort_by(Axis.Y)[:2]
-            fillet(edges, radius=p.channel_edge_radius)
-        face = builder.faces().filter_by(Axis.Y).sort_by(Axis.Y)[-1]
-        location = face.without_holes().location_at(0.0, 0.5, x_dir=(1, 0, 0))
-        location *= Pos(X=p.channel_offset_x)
-        location *= Pos(Z=p.channel_size / 2)
-        location *= Rot(X=90)
-        location *= Rot(Z=180)
-        with Locations(location):
-            add(channel_builder, mode=Mode.SUBTRACT)
+        with stage("mount", builder):
+            with BuildSketch(Plane.XZ):
+                SlotOverall(p.mount_height, p.mount_width, rotation=90)
+            extrude(amount=p.mount_depth)
+
+        with stage("holes", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face, x_dir=(1, 0, 0))):
+                # inner slot
+                SlotOverall(p.inner_slot_height, p.inner_slot_width, rotation=90)
+                # doorbell mount plate
+                with GridLocations(0, p.doorbell_screw_spacing_y, 1, 2):
+                    Circle(p.doorbell_screw_diameter / 2)
+                # wall slot
+                with GridLocations(0, p.wall_slot_spacing_y, 1, 2):
+                    SlotOverall(
+                        p.wall_slot_inner_height, p.wall_slot_inner_width, rotation=90
+                    )
+            extrude(amount=-p.mount_depth, mode=Mode.SUBTRACT)
+
+        with stage("wall outer slot", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                with GridLocations(0, p.wall_slot_spacing_y, 1, 2):
+                    SlotOverall(
+                        p.wall_slot_outer_height, p.wall_slot_outer_width, rotation=90
+                    )
+            extrude(amount=-p.wall_slot_outer_depth, mode=Mode.SUBTRACT)
+
+        with stage("doorbell pegs", builder):
+            face = select_faces(builder, Axis.Y)[0]
+            with BuildSketch(Plane(face.without_holes(), x_dir=(1, 0, 0))):
+                with GridLocations(
+                    p.doorbell_peg_spacing_x, p.doorbell_peg_spacing_y, 2, 2
+                ):
+                    Circle(p.doorbell_peg_diameter / 2)
+            extrude(amount=p.doorbell_peg_depth)
+
+        with stage("channel", builder):
+            with BuildPart(mode=Mode.PRIVATE) as channel_builder:
+                Box(p.channel_size, p.channel_size, p.mount_height)
+                if not is_draft():
+                    edges = select_edges(channel_builder, Axis.Z, Axis.Y)[:2]
+                    fillet(edges, radius=p.channel_edge_radius)
+            face = select_faces(builder, Axis.Y)[-1]
+            location = face.without_holes().location_at(0.0, 0.5, x_dir=(1, 0, 0))
+            location *= Pos(X=p.channel_offset_x)
+            location *= Pos(Z=p.channel_size / 2)
+            location *= Rot(X=90)
+            location *= Rot(Z=180)
+            with Locations(location):
+                add(channel_builder, mode=Mode.SUBTRACT)
     return builder
 
 
-main(builder_fn, Parameters())
+model = Model([builder_fn], {"default": Parameters()})
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
@@ -1,6 +1,7 @@
 from bd_warehouse.fastener import *
 from build123d import *
-from common import *
+
+from cad_models.common import *
 
 
 @dataclass
@@ -21,30 +22,42 @@ class Parameters:
     standoff_nut_depth: float = 3 * MM
 
 
-def builder_fn(p: Parameters):
-    with BuildPart(mode=Mode.PRIVATE):
-        screw = PanHeadScrew(p.ssd_screw_size, p.adapter_thickness)
-        nut = HeatSetNut(
-            p.standoff_nut_size, fastener_type=typing.cast(typing.Any, "AE-SamZhihui")
-        )
-
+def build_adapter(p: Parameters) -> Part:
     with BuildPart() as builder:
-        # adapter
         with BuildSketch():
             Rectangle(p.adapter_width, p.adapter_height)
         extrude(amount=p.adapter_thickness)
+    return require(builder.part)
+
 
-        # ssd holes
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
+def cut_ssd_holes(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Z)[-1]
         plane = Plane(face.center(), x_dir=(1, 0, 0), z_dir=(face.normal_at()))
         location = Location(plane)
         location *= Pos(Y=p.ssd_offset_y)
         with Locations(location):
             with GridLocations(p.ssd_spacing_x, p.ssd_spacing_y, 2, 2):
-                ClearanceHole(screw)
+                # draft cuts plain holes rather than building the fasteners
+                if is_draft():
+                    Hole(get_metric_diameter(p.ssd_screw_size) / 2)
+                else:
+                    hole = fastener_hole(
+                        ClearanceHole,
+                        PanHeadScrew,
+                        p.ssd_screw_size,
+                        depth=2 * builder.max_dimension,
+                        length=p.adapter_thickness,
+                    )
+                    add(hole, mode=Mode.SUBTRACT)
+    return require(builder.part)
+
 
-        # standoff holes
-        face = builder.faces().filter_by(Axis.Z).sort_by(Axis.Z)[-1]
+def cut_standoff_holes(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
+        face = select_faces(builder, Axis.Z)[-1]
         plane = Plane(
             face.without_holes().center(), x_dir=(1, 0, 0), z_dir=face.normal_at()
         )
@@ -53,13 +66,48 @@ def builder_fn(p: Parameters):
         with Locations(location):
             # NOTE: depth seems to be 'in addition to' nut depth, but also needs to be > 0.
             with GridLocations(p.standoff_spacing_x, p.standoff_spacing_y, 2, 2):
-                InsertHole(nut, depth=0.0001 * MM)
+                if is_draft():
+                    Hole(p.standoff_diameter / 2, p.standoff_nut_depth)
+                else:
+                    hole = fastener_hole(
+                        InsertHole,
+                        HeatSetNut,
+                        p.standoff_nut_size,
+                        depth=0.0001 * MM,
+                        fastener_type="AE-SamZhihui",
+                    )
+                    add(hole, mode=Mode.SUBTRACT)
+    return require(builder.part)
 
-        # fillet
+
+def fillet_adapter(p: Parameters, part: Part) -> Part:
+    with BuildPart() as builder:
+        add(part, clean=False)
         edges = builder.edges().filter_by(Axis.Z)
         fillet(edges, p.adapter_fillet_radius)
+    return require(builder.part)
+
+
+def builder_fn(p: Parameters):
+    with BuildPart() as builder:
+        with stage("adapter", builder) as s:
+            s.checkpoint(build_adapter, p)
+
+        with stage("ssd holes", builder) as s:
+            s.checkpoint(cut_ssd_holes, p)
+
+        with stage("standoff holes", builder) as s:
+            s.checkpoint(cut_standoff_holes, p)
+
+        if not is_draft():
+            with stage("fillet", builder) as s:
+                s.checkpoint(fillet_adapter, p)
 
     return builder
 
 
-main(builder_fn, Parameters())
+model = Model([builder_fn], {"default": Parameters()})
+
+
+if __name__ == "__main__":
+    main(model.build_part_fns, model.variants)
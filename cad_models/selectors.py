@@ -0,0 +1,136 @@
+import functools
+import math
+import typing
+import weakref
+
+from build123d import (
+    Axis,
+    BuildPart,
+    Edge,
+    Face,
+    GeomType,
+    Location,
+    Part,
+    Shape,
+    ShapeList,
+    Vector,
+)
+from OCP.BRepGProp import BRepGProp_Face
+from OCP.BRepTools import BRepTools
+from OCP.gp import gp_Dir, gp_Pnt, gp_Vec
+from OCP.TopoDS import TopoDS_Face
+
+
+class SelectorGeometry:
+    # computed on first use - filtering only needs the direction, sorting the center
+    def __init__(self, shape: Face | Edge):
+        self.shape = shape
+
+    @functools.cached_property
+    def center(self) -> Vector:
+        return self.shape.center()
+
+    @functools.cached_property
+    def direction(self) -> gp_Dir | None:
+        # evaluated where ShapeList.filter_by evaluates it - the normal of planar faces
+        # at their minimum uv, the direction of linear edges at their first parameter
+        point, vector = gp_Pnt(), gp_Vec()
+        if isinstance(self.shape, Face):
+            if not self.shape.is_planar_face:
+                return None
+            face = typing.cast(TopoDS_Face, self.shape.wrapped)
+            u, _, v, _ = BRepTools.UVBounds_s(face)
+            BRepGProp_Face(face).Normal(u, v, point, vector)
+            return gp_Dir(vector)
+        if self.shape.geom_type != GeomType.LINE:
+            return None
+        curve = self.shape.geom_adaptor()
+        curve.D1(curve.FirstParameter(), point, vector)
+        return gp_Dir(vector)
+
+
+class SelectorIndex:
+    # answers filter_by(axis).sort_by(axis) from face/edge geometry computed once per
+    # shape revision - geometry of faces and edges that survive a boolean carries over
+    def __init__(self):
+        self.shape: Part | None = None
+        self.items: dict[str, ShapeList] = {}
+        self.geometry: dict[str, dict[Shape, SelectorGeometry]] = {}
+        self.results: dict[tuple[str, Axis, Axis], ShapeList] = {}
+
+    def update(self, shape: Part):
+        if shape is not self.shape:
+            self.shape = shape
+            self.items = {}
+            self.results = {}
+
+    def get_items(self, kind: str) -> ShapeList:
+        if kind not in self.items:
+            shape = self.shape
+            if shape is None:
+                raise ValueError("shape is None")
+            items = shape.faces() if kind == "faces" else shape.edges()
+            previous = self.geometry.get(kind, {})
+            self.geometry[kind] = {
+                item: previous.get(item) or SelectorGeometry(item) for item in items
+            }
+            self.items[kind] = items
+        return self.items[kind]
+
+    def select(self, kind: str, filter_by: Axis, sort_by: Axis) -> ShapeList:
+        key = (kind, filter_by, sort_by)
+        if key not in self.results:
+            items = self.get_items(kind)
+            geometry = self.geometry[kind]
+            # the same test as ShapeList.filter_by - Axis.is_parallel, with its default
+            # tolerance of 1e-5 degrees
+            filter_direction = filter_by.wrapped.Direction()
+            tolerance = math.radians(1e-5)
+            filtered = []
+            for item in items:
+                direction = geometry[item].direction
+                if direction is None:
+                    continue
+                if filter_direction.IsParallel(direction, tolerance):
+                    filtered.append(item)
+            # the same key as ShapeList.sort_by
+            sort_location = sort_by.location.inverse()
+
+            def sort_key(item: Shape) -> float:
+                center = geometry[item].center
+                return (sort_location * Location(center)).position.Z
+
+            self.results[key] = ShapeList(sorted(filtered, key=sort_key))
+        return ShapeList(self.results[key])
+
+
+selector_indexes: weakref.WeakKeyDictionary[BuildPart, SelectorIndex] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_selector_index(builder: BuildPart) -> SelectorIndex:
+    index = selector_indexes.get(builder)
+    if index is None:
+        index = selector_indexes[builder] = SelectorIndex()
+    part = builder.part
+    if part is None:
+        raise ValueError("builder has no part")
+    index.update(part)
+    return index
+
+
+def select_faces(
+    builder: BuildPart, filter_by: Axis, sort_by: Axis | None = None
+) -> ShapeList[Face]:
+    # builder.faces().filter_by(filter_by).sort_by(sort_by or filter_by)
+    index = get_selector_index(builder)
+    return index.select("faces", filter_by, sort_by or filter_by)
+
+
+def select_edges(
+    builder: BuildPart, filter_by: Axis, sort_by: Axis | None = None
+) -> ShapeList[Edge]:
+    # builder.edges().filter_by(filter_by).sort_by(sort_by or filter_by)
+    index = get_selector_index(builder)
+    return index.select("edges", filter_by, sort_by or filter_by)
@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import copy
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import threading
+import typing
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cad_models.cli import fidelities, log_levels
+from cad_models.common import KeystoneReceiver
+from cad_models.jobs import VariantJob, run_variant_job
+from cad_models.memory import MemoryBudgetError, parse_bytes
+from cad_models.parts import validate_parameters
+from cad_models.registry import get_model_info, get_models, load_model
+
+# requests are queued and built by a pool of workers - OCCT, every model and the
+# assets are loaded before the first request - e.g.
+#   curl -d '{"model": "cable_clip", "variant": "2-cable"}' localhost:8123/build
+
+logger = logging.getLogger(__name__)
+
+content_types = {"step": "model/step", "3mf": "model/3mf"}
+
+
+@dataclass
+class BuildRequest:
+    model: str
+    variant: str
+    parameters: dict[str, typing.Any] = field(default_factory=dict)
+    format: str = "step"
+    fidelity: str = "full"
+
+
+def parse_request(data: typing.Any) -> BuildRequest:
+    if not isinstance(data, dict):
+        raise ValueError("request must be a json object")
+    fields = {f.name for f in dataclasses.fields(BuildRequest)}
+    for key in data:
+        if key not in fields:
+            raise ValueError(f"invalid request field: {key}")
+    try:
+        request = BuildRequest(**data)
+    except TypeError as e:
+        raise ValueError(str(e)) from None
+    info = get_model_info(request.model)
+    if request.variant not in info.variants:
+        raise ValueError(f"invalid variant: {request.variant}")
+    if not isinstance(request.parameters, dict):
+        raise ValueError("parameters must be a json object")
+    if request.format not in content_types:
+        raise ValueError(f"invalid format: {request.format}")
+    if request.fidelity not in fidelities:
+        raise ValueError(f"invalid fidelity: {request.fidelity}")
+    # checked here rather than in a worker - bad parameters are the client's error
+    model = load_model(request.model)
+    validate_parameters(get_parameters(model.variants[request.variant], request))
+    return request
+
+
+def coerce_parameter(name: str, value: typing.Any, field_type: typing.Any):
+    # json numbers may be ints where floats are expected, nothing else converts
+    if field_type is float and type(value) is int:
+        return float(value)
+    if field_type not in (bool, int, float, str):
+        raise ValueError(f"parameter can't be overridden: {name}")
+    if type(value) is not field_type:
+        raise ValueError(f"parameter must be a {field_type.__name__}: {name}")
+    return value
+
+
+def get_parameters(parameters: typing.Any, request: BuildRequest):
+    field_types = typing.get_type_hints(type(parameters))
+    names = {f.name for f in dataclasses.fields(parameters) if f.init}
+    overrides = {}
+    for name, value in request.parameters.items():
+        if name not in names:
+            raise ValueError(f"invalid parameter: {name}")
+        overrides[name] = coerce_parameter(name, value, field_types[name])
+    # variants are shared by every request a worker builds - replace a copy
+    return dataclasses.replace(copy.deepcopy(parameters), **overrides)
+
+
+def warm():
+    for info in get_models().values():
+        load_model(info.name)
+    KeystoneReceiver.get_solid()
+
+
+def run_build(request: BuildRequest, cache: bool, max_memory: int | None) -> bytes:
+    model = load_model(request.model)
+    parameters = get_parameters(model.variants[request.variant], request)
+    with tempfile.TemporaryDirectory() as folder:
+        export = pathlib.Path(folder).joinpath(f"part.{request.format}")
+        job = VariantJob(
+            build_part_fns=model.build_part_fns,
+            cache=cache,
+            export=export,
+            fidelity=request.fidelity,
+            limit_hex_grid=False,
+            max_memory=max_memory,
+            memory=False,
+            model=get_model_info(request.model).name,
+            ocp=False,
+            parameters=parameters,
+            timings=False,
+            variant=request.variant,
+            warm=True,
+        )
+        run_variant_job(job)
+        return export.read_bytes()
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class BuildService:
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int = 16,
+        cache: bool = True,
+        max_memory: int | None = None,
+    ):
+        self.workers = workers
+        self.cache = cache
+        self.max_memory = max_memory
+        # requests being built plus those waiting for a worker
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.lock = threading.Lock()
+        # requests are checked against the models here, before they take a slot
+        warm()
+        # workers come from a forkserver rather than forking this process - it runs
+        # request threads, and a pool is replaced from one when a worker dies. the
+        # forkserver imports OCCT and every model once, workers load the assets
+        modules = [info.module for info in get_models().values()]
+        self.mp_context = multiprocessing.get_context("forkserver")
+        self.mp_context.set_forkserver_preload([__name__, *modules])
+        self.executor = self.start()
+        for future in [self.executor.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+
+    def start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self.workers, mp_context=self.mp_context, initializer=warm
+        )
+
+    def submit(self, request: BuildRequest) -> "Future[bytes]":
+        if not self.slots.acquire(blocking=False):
+            raise QueueFullError("build queue is full")
+        try:
+            with self.lock:
+                future = self.executor.submit(
+                    run_build, request, self.cache, self.max_memory
+                )
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def build(self, request: BuildRequest) -> bytes:
+        executor = self.executor
+        try:
+            return self.submit(request).result()
+        except BrokenProcessPool:
+            # e.g. the kernel killed a worker - replace the pool, unless another
+            # request already did
+            with self.lock:
+                if executor is self.executor:
+                    self.executor = self.start()
+                    executor.shutdown(wait=False)
+            raise RuntimeError("build worker exited unexpectedly") from None
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class BuildServer(ThreadingHTTPServer):
+    def __init__(self, address: tuple[str, int], service: BuildService):
+        super().__init__(address, BuildRequestHandler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    server: BuildServer
+
+    def do_GET(self):
+        if self.path != "/models":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        models = {info.name: info.variants for info in get_models().values()}
+        self.send_body(json.dumps(models).encode(), "application/json")
+
+    def do_POST(self):
+        if self.path != "/build":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = parse_request(json.loads(self.rfile.read(length)))
+        except (json.JSONDecodeError, ValueError) as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        # the request is valid - anything the build raises is the server's error
+        try:
+            body = self.server.service.build(request)
+        except QueueFullError as e:
+            self.send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            return
+        except MemoryBudgetError:
+            logger.exception("build failed")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "memory budget exceeded")
+            return
+        except Exception:
+            # details stay in the log - exceptions can carry paths and internals
+            logger.exception("build failed")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "build failed")
+            return
+        self.send_body(body, content_types[request.format])
+
+    def send_body(self, body: bytes, content_type: str):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any):
+        logger.info(format, *args)
+
+
+class Client:
+    def __init__(self, url: str):
+        self.url = url
+
+    def get_models(self) -> dict[str, list[str]]:
+        with urllib.request.urlopen(f"{self.url}/models") as response:
+            return json.loads(response.read())
+
+    def build(
+        self,
+        model: str,
+        variant: str,
+        parameters: dict[str, typing.Any] | None = None,
+        format: str = "step",
+        fidelity: str = "full",
+    ) -> bytes:
+        request = BuildRequest(model, variant, parameters or {}, format, fidelity)
+        data = json.dumps(dataclasses.asdict(request)).encode()
+        headers = {"Content-Type": "application/json"}
+        http_request = urllib.request.Request(
+            f"{self.url}/build", data=data, headers=headers
+        )
+        try:
+            with urllib.request.urlopen(http_request) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            # send_error puts the message in the reason phrase
+            if e.code == HTTPStatus.BAD_REQUEST:
+                raise ValueError(e.reason) from None
+            raise
+
+
+@contextlib.contextmanager
+def local_server(workers: int = 1, **kwargs: typing.Any) -> typing.Iterator[Client]:
+    # a server on a free port in this process - e.g. for tests
+    service = BuildService(workers, **kwargs)
+    server = BuildServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield Client(server.url)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+@dataclass
+class ServerArgs:
+    host: str
+    log_level: str
+    max_memory: str | None
+    max_queue: int
+    no_cache: bool
+    port: int
+    workers: int
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m cad_models.server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--log-level", default="INFO", choices=log_levels)
+    parser.add_argument(
+        "--max-memory",
+        default=None,
+        help="fail a build that adds more resident memory than this, e.g. 4G",
+    )
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--no-cache", default=False, action="store_true")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ServerArgs(**vars(parser.parse_args()))
+
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(args.log_level)
+    max_memory = parse_bytes(args.max_memory) if args.max_memory else None
+    service = BuildService(
+        args.workers, args.max_queue, cache=not args.no_cache, max_memory=max_memory
+    )
+    server = BuildServer((args.host, args.port), service)
+    logger.info("serving on %s with %d workers", server.url, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
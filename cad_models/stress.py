@@ -0,0 +1,176 @@
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import pathlib
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from build123d import MM
+
+from cad_models.cache import bypass_caches
+from cad_models.common import KeystoneReceiver, Model, clear_caches
+from cad_models.memory import format_bytes, get_peak_rss, get_rss
+from cad_models.parts import build_variant
+from cad_models.timings import print_table
+
+
+@dataclass
+class Sweep:
+    model: str
+    size: str
+    sizes: list[int]
+    parameters: typing.Callable[[typing.Any, int], typing.Any]
+
+
+def keystone_patch_panel(module: typing.Any, count: int) -> typing.Any:
+    p = module.Parameters(keystone_count=count)
+    min_width = count * (KeystoneReceiver.width() + 2 * MM) + (p.ear_width * 2)
+    p.panel_width = max(p.panel_width, min_width)
+    return p
+
+
+def keystone_surface_mount(module: typing.Any, count: int) -> typing.Any:
+    p = module.Parameters(keystone_left_count=count, keystone_right_count=count)
+    spacing = KeystoneReceiver.height() + p.keystone_spacing
+    min_height = (count * spacing) + (p.wall_thickness_y * 2) + (20 * MM)
+    p.box_height = max(p.box_height, min_height)
+    return p
+
+
+def rack_shelf_devices(module: typing.Any, count: int) -> typing.Any:
+    p = module.Parameters(devices=[module.RaspberryPi() for _ in range(count)])
+    min_width = count * (p.devices[0].width + 10 * MM) + (p.mount_thickness * 2)
+    p.rack_width = max(p.rack_width, min_width)
+    p.mount_width = p.rack_width + (p.ear_width * 2)
+    return p
+
+
+def rack_shelf_hex_density(module: typing.Any, density: int) -> typing.Any:
+    # cell count grows linearly with density
+    radius = 6 * MM / math.sqrt(density)
+    return module.Parameters(
+        devices=[module.RaspberryPi()], hex_radius=radius, hex_spacing=radius
+    )
+
+
+sweeps = {
+    "keystone-count": Sweep(
+        "keystone_patch_panel",
+        "keystone_count",
+        [8, 16, 24, 48, 96],
+        keystone_patch_panel,
+    ),
+    "surface-mount-keystones": Sweep(
+        "keystone_surface_mount",
+        "keystones per side",
+        [1, 2, 4, 8, 12],
+        keystone_surface_mount,
+    ),
+    "shelf-devices": Sweep("rack_shelf", "devices", [1, 2, 4, 8], rack_shelf_devices),
+    "hex-density": Sweep(
+        "rack_shelf", "hex density", [1, 2, 4, 8, 16], rack_shelf_hex_density
+    ),
+}
+
+
+@dataclass
+class StressArgs:
+    output: pathlib.Path | None
+    sweep: list[str] | None
+
+
+def measure_point(name: str, size: int) -> dict:
+    sweep = sweeps[name]
+    module = importlib.import_module(f"cad_models.{sweep.model}")
+    model = typing.cast(Model, module.model)
+    parameters = sweep.parameters(module, size)
+
+    # disk caches are bypassed too - hole tools and hex grids are part of the cost
+    clear_caches()
+    start_rss = get_rss()
+    with bypass_caches():
+        start = time.perf_counter()
+        packed = build_variant(model.build_part_fns, parameters, cache=False)
+        duration = time.perf_counter() - start
+
+    return {
+        "size": size,
+        "time": duration,
+        "start_rss": start_rss,
+        "peak_rss": get_peak_rss(),
+        "faces": sum(len(shape.faces()) for shape in packed),
+    }
+
+
+def get_exponent(points: list[dict]) -> float | None:
+    # least-squares slope of log(time) over log(size) - ~1 is linear, >1 superlinear
+    points = [point for point in points if point["time"] > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(point["size"]) for point in points]
+    ys = [math.log(point["time"]) for point in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return numerator / denominator
+
+
+def run_sweep(name: str) -> dict:
+    sweep = sweeps[name]
+    points = []
+    mp_context = multiprocessing.get_context("fork")
+    for size in sweep.sizes:
+        # a fresh process per point, so that peak rss belongs to that build alone
+        with ProcessPoolExecutor(1, mp_context=mp_context) as executor:
+            point = executor.submit(measure_point, name, size).result()
+        print(f"{name}: {sweep.size}={size} {point['time']:.3f}s", file=sys.stderr)
+        points.append(point)
+    return {
+        "model": sweep.model,
+        "size": sweep.size,
+        "points": points,
+        "exponent": get_exponent(points),
+    }
+
+
+def print_sweep(name: str, result: dict):
+    exponent = result["exponent"]
+    exponent = "-" if exponent is None else f"{exponent:.2f}"
+    print(f"{name} ({result['model']}, time ~ {result['size']}^{exponent})")
+    rows = [(result["size"], "time", "start rss", "peak rss", "faces")]
+    for point in result["points"]:
+        row = (
+            str(point["size"]),
+            f"{point['time']:.3f}s",
+            format_bytes(point["start_rss"]),
+            format_bytes(point["peak_rss"]),
+            str(point["faces"]),
+        )
+        rows.append(row)
+    print_table(rows)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m cad_models.stress")
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    parser.add_argument("--sweep", action="append", choices=sweeps.keys())
+    args = StressArgs(**vars(parser.parse_args()))
+
+    results = {}
+    for name in args.sweep or list(sweeps.keys()):
+        results[name] = run_sweep(name)
+        print_sweep(name, results[name])
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
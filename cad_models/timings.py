@@ -0,0 +1,119 @@
+import contextlib
+import time
+import tracemalloc
+import typing
+from dataclasses import dataclass
+
+from build123d import BuildPart
+
+from cad_models.memory import check_memory_budget, format_bytes, get_peak_rss, get_rss
+
+
+@dataclass
+class StageTiming:
+    name: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    faces: int | None = None
+    edges: int | None = None
+    solids: int | None = None
+    rss: int | None = None
+    peak_rss: int | None = None
+    python_peak: int | None = None
+    # restored from a checkpoint rather than built
+    restored: bool = False
+
+
+# collected only while main runs with --timings or --memory
+stage_timings: list[StageTiming] | None = None
+stage_names: list[str] = []
+# tracemalloc peaks seen by the enclosing measurements before a nested one reset them
+python_peaks: list[int] = []
+
+
+@contextlib.contextmanager
+def measure(timing: StageTiming) -> typing.Iterator[None]:
+    check_memory_budget()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        if python_peaks:
+            python_peaks[-1] = max(python_peaks[-1], tracemalloc.get_traced_memory()[1])
+        python_peaks.append(0)
+        tracemalloc.reset_peak()
+    wall_time = time.perf_counter()
+    cpu_time = time.process_time()
+    try:
+        yield
+    finally:
+        timing.wall_time = time.perf_counter() - wall_time
+        timing.cpu_time = time.process_time() - cpu_time
+        if tracing:
+            timing.rss = get_rss()
+            # the kernel updates the high-water mark lazily
+            timing.peak_rss = max(get_peak_rss(), timing.rss or 0)
+            timing.python_peak = max(
+                python_peaks.pop(), tracemalloc.get_traced_memory()[1]
+            )
+    check_memory_budget()
+
+
+@contextlib.contextmanager
+def measure_stage(
+    name: str, builder: BuildPart | None = None
+) -> typing.Iterator[StageTiming | None]:
+    if stage_timings is None:
+        check_memory_budget()
+        yield None
+        check_memory_budget()
+        return
+    stage_names.append(name)
+    timing = StageTiming(" > ".join(stage_names))
+    stage_timings.append(timing)
+    try:
+        with measure(timing):
+            yield timing
+    finally:
+        stage_names.pop()
+        shape = builder.part if builder else None
+        if shape:
+            timing.faces = len(shape.faces())
+            timing.edges = len(shape.edges())
+            timing.solids = len(shape.solids())
+
+
+def print_table(rows: list[tuple[str, ...]], left_columns: int = 1):
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+    for row in rows:
+        values = []
+        for index, (value, width) in enumerate(zip(row, widths)):
+            value = value.ljust(width) if index < left_columns else value.rjust(width)
+            values.append(value)
+        print("  ".join(values).rstrip())
+
+
+def print_stage_timings(variant_timings: dict[str, list[StageTiming]], memory: bool):
+    def count(value: int | None) -> str:
+        return "-" if value is None else str(value)
+
+    rows = [("variant", "stage", "wall", "cpu", "faces", "edges", "solids")]
+    if memory:
+        rows[0] += ("rss", "peak rss", "python peak")
+    for variant, timings in variant_timings.items():
+        for timing in timings:
+            row = (
+                variant,
+                f"{timing.name} (restored)" if timing.restored else timing.name,
+                f"{timing.wall_time:.3f}s",
+                f"{timing.cpu_time:.3f}s",
+                count(timing.faces),
+                count(timing.edges),
+                count(timing.solids),
+            )
+            if memory:
+                row += (
+                    format_bytes(timing.rss),
+                    format_bytes(timing.peak_rss),
+                    format_bytes(timing.python_peak),
+                )
+            rows.append(row)
+    print_table(rows, left_columns=2)
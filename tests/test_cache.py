@@ -0,0 +1,40 @@
+import pytest
+
+from cad_models.cache import DiskCache, bypass_caches
+from cad_models.jobs import main
+from cad_models.registry import load_model
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAD_MODELS_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def test_bypass_caches_misses_and_stores_nothing():
+    cache = DiskCache("test", ".txt", max_bytes=1024)
+    with cache.put("key") as path:
+        path.write_text("value")
+    with bypass_caches():
+        assert cache.get("key") is None
+        with cache.put("other") as path:
+            path.write_text("value")
+    assert cache.get("key")
+    assert cache.get("other") is None
+    assert [p.name for p in cache.folder.iterdir()] == ["key.txt"]
+
+
+def test_no_cache_writes_no_disk_cache(tmp_path):
+    model = load_model("cable_clip")
+    export = tmp_path / "clip.3mf"
+    args = [
+        "--variant",
+        "2-cable",
+        "--no-cache",
+        "--jobs",
+        "1",
+        "--export",
+        str(export),
+    ]
+    main(model.build_part_fns, model.variants, args=args)
+    assert export.exists()
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,81 @@
+import cProfile
+import importlib.util
+import pathlib
+import shutil
+
+import pytest
+from build123d import *
+
+from cad_models import cable_clip, checkpoints, parts, timings
+from cad_models.checkpoints import stage
+from cad_models.parts import build_part
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAD_MODELS_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def load_module(path: pathlib.Path):
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build(module, monkeypatch) -> tuple[Part, dict[str, bool]]:
+    stage_timings: list[timings.StageTiming] = []
+    monkeypatch.setattr(timings, "stage_timings", stage_timings)
+    part = build_part(module.builder_fn, module.model.variants["2-cable"])
+    return part, {t.name.split(" > ")[-1]: t.restored for t in stage_timings[1:]}
+
+
+def test_editing_a_late_stage_default_restores_earlier_stages(tmp_path, monkeypatch):
+    source = pathlib.Path(cable_clip.__file__).read_text()
+    edited = source.replace(
+        "fillet_radius: float = 2 * MM", "fillet_radius: float = 1.5 * MM"
+    )
+    assert edited != source
+    tmp_path.joinpath("clip_before.py").write_text(source)
+    tmp_path.joinpath("clip_after.py").write_text(edited)
+
+    _, restored = build(load_module(tmp_path / "clip_before.py"), monkeypatch)
+    assert restored == {"clip": False, "screw holes": False, "fillet": False}
+
+    after = load_module(tmp_path / "clip_after.py")
+    part, restored = build(after, monkeypatch)
+    assert restored == {"clip": True, "screw holes": True, "fillet": False}
+
+    expected = build_part(after.builder_fn, after.model.variants["2-cable"], False)
+    assert part.volume == pytest.approx(expected.volume)
+    assert len(part.faces()) == len(expected.faces())
+
+
+def test_stage_must_read_parameters_through_its_argument(monkeypatch):
+    monkeypatch.setattr(checkpoints, "checkpoint_key", "key")
+    p = cable_clip.model.variants["2-cable"]
+
+    def build_box(_: cable_clip.Parameters) -> Part:
+        return Part(Box(p.clip_width, 1, 1).wrapped)
+
+    with BuildPart() as builder:
+        with stage("box", builder) as s:
+            with pytest.raises(TypeError, match="other than through its argument"):
+                s.checkpoint(build_box, p)
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_checkpointed_build_runs_under_a_profiler(monkeypatch, cache):
+    p = cable_clip.model.variants["2-cable"]
+    expected = build_part(cable_clip.builder_fn, p, cache=False)
+    for restored in [False, cache]:
+        # the part itself isn't cached, so that the stages run or are restored
+        shutil.rmtree(parts.part_cache.folder, ignore_errors=True)
+        stage_timings: list[timings.StageTiming] = []
+        monkeypatch.setattr(timings, "stage_timings", stage_timings)
+        profile = cProfile.Profile()
+        part = profile.runcall(build_part, cable_clip.builder_fn, p, cache=cache)
+        assert [t.restored for t in stage_timings[1:]] == [restored] * 3
+        assert part.volume == pytest.approx(expected.volume)
+        assert len(part.faces()) == len(expected.faces())
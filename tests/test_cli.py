@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+from cad_models.registry import get_model_info
+
+help_script = """
+import runpy, sys
+sys.argv = ["cad_models", "keystone_surface_mount", "--help"]
+try:
+    runpy.run_module("cad_models", run_name="__main__")
+except SystemExit:
+    pass
+print("build123d" in sys.modules)
+"""
+
+
+def test_model_help_does_not_load_build123d():
+    result = subprocess.run(
+        [sys.executable, "-c", help_script], capture_output=True, text=True, check=True
+    )
+    assert "--part PART" in result.stdout
+    assert "box, cover" in result.stdout
+    assert result.stdout.splitlines()[-1] == "False"
+
+
+def test_model_info_parts():
+    info = get_model_info("keystone_surface_mount")
+    assert info.parts == ["box", "cover"]
+    assert info.variants == ["interior-wall", "exterior-wall"]
@@ -0,0 +1,118 @@
+import shutil
+import typing
+
+import pytest
+from bd_warehouse.fastener import ClearanceHole, PanHeadScrew
+from build123d import *
+from build123d import Shape
+
+from cad_models import common, parts
+from cad_models.cache import DiskCache
+from cad_models.common import (
+    build_counter_sink_hole,
+    build_fastener_hole,
+    build_hex_grid,
+    clear_caches,
+    counter_sink_hole,
+    fastener_hole,
+    get_hex_grid,
+)
+from cad_models.parts import build_part, build_variant
+from cad_models.registry import load_model
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAD_MODELS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(common, "fidelity", "full")
+    monkeypatch.setattr(common, "limit_hex_grid", False)
+    clear_caches()
+    yield
+    clear_caches()
+
+
+def summarize(shape: Shape) -> list[float]:
+    box = shape.bounding_box()
+    counts = [len(shape.solids()), len(shape.faces()), len(shape.edges())]
+    return [shape.volume, *box.min, *box.max, *counts]
+
+
+def matches(shape: Shape, expected: Shape) -> bool:
+    return summarize(shape) == pytest.approx(summarize(expected), abs=1e-6)
+
+
+def assert_cached(cache: DiskCache, get: typing.Callable[[], Shape], expected: Shape):
+    # once stored, then once read back from disk
+    stored = get()
+    clear_caches()
+    restored = get()
+    assert len(list(cache.folder.iterdir())) == 1
+    assert matches(stored, expected)
+    assert matches(restored, expected)
+
+
+def test_cached_hex_grid_matches_build():
+    args = (60 * MM, 40 * MM, 3 * MM, 1 * MM, 2 * MM, False)
+    assert_cached(
+        common.hex_grid_cache, lambda: get_hex_grid(*args), build_hex_grid(*args)
+    )
+
+
+def test_cached_fastener_hole_matches_build():
+    args = (ClearanceHole, PanHeadScrew, "M3-0.5", 10 * MM, 5 * MM, None)
+    assert_cached(
+        common.hole_tool_cache, lambda: fastener_hole(*args), build_fastener_hole(*args)
+    )
+
+
+def test_cached_counter_sink_hole_matches_build():
+    args = (2 * MM, 4 * MM, 10 * MM)
+    assert_cached(
+        common.hole_tool_cache,
+        lambda: counter_sink_hole(*args),
+        build_counter_sink_hole(*args),
+    )
+
+
+def test_cached_part_matches_uncached_build():
+    model = load_model("rpi_ssd_adapter")
+    build_part_fn = model.build_part_fns[0]
+    parameters = model.variants["default"]
+    expected = build_part(build_part_fn, parameters, cache=False)
+    # built, read from the part cache, then rebuilt from stage checkpoints
+    assert matches(build_part(build_part_fn, parameters), expected)
+    assert matches(build_part(build_part_fn, parameters), expected)
+    shutil.rmtree(parts.part_cache.folder)
+    clear_caches()
+    assert matches(build_part(build_part_fn, parameters), expected)
+
+
+# volume, area, faces and edges of each packed shape, as built with --fidelity full
+# before build times were optimized
+reference_geometry = {
+    ("cable_clip", "2-cable"): [(900.353, 896.809, 20, 53)],
+    ("rpi_ssd_adapter", "default"): [(34441.248, 16058.158, 30, 60)],
+    ("keystone_surface_mount", "interior-wall"): [
+        (314585.142, 93402.017, 64, 184),
+        (93935.326, 40230.308, 8, 18),
+    ],
+    ("rack_bracket", "gigaplus"): [(7052.955, 6359.532, 24, 62)],
+}
+
+
+@pytest.mark.parametrize("cache", [False, True])
+@pytest.mark.parametrize("model_name, variant", list(reference_geometry))
+def test_full_fidelity_matches_reference(model_name, variant, cache):
+    model = load_model(model_name)
+    parameters = model.variants[variant]
+    if cache:
+        # the second build is read back from the disk caches
+        build_variant(model.build_part_fns, parameters)
+        clear_caches()
+    shapes = build_variant(model.build_part_fns, parameters, cache=cache)
+    geometry = [
+        (pytest.approx(s.volume, abs=1e-3), pytest.approx(s.area, abs=1e-3))
+        + (len(s.faces()), len(s.edges()))
+        for s in shapes
+    ]
+    assert geometry == reference_geometry[(model_name, variant)]
@@ -0,0 +1,22 @@
+import logging
+
+from cad_models.jobs import configure_logging
+
+
+def test_configure_logging_replaces_handlers(tmp_path):
+    logger = logging.getLogger("build123d")
+    handlers = list(logger.handlers)
+    try:
+        configure_logging("INFO", tmp_path / "first.log")
+        first = [h for h in logger.handlers if h not in handlers]
+        configure_logging("WARNING", tmp_path / "second.log")
+        second = [h for h in logger.handlers if h not in handlers]
+        assert len(first) == len(second) == 2
+        assert not set(first) & set(second)
+        file_handler = next(h for h in first if isinstance(h, logging.FileHandler))
+        assert file_handler.stream is None
+    finally:
+        configure_logging("INFO")
+        for handler in logger.handlers[:]:
+            if handler not in handlers:
+                logger.removeHandler(handler)
@@ -0,0 +1,23 @@
+import pytest
+
+from cad_models.jobs import main
+from cad_models.registry import load_model
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--variant", "nope"], "invalid variant: nope"),
+        (["--variant", "2-cable", "--part", "nope"], "invalid part: nope"),
+        (["--variant", "all", "--ocp"], "--ocp requires a single variant"),
+        (["--variant", "all", "--watch"], "--watch requires a single variant"),
+        (["--variant", "all", "--export", "x.step"], "requires a {variant} field"),
+        (["--variant", "2-cable", "--max-memory", "lots"], "invalid size"),
+    ],
+)
+def test_main_reports_usage_errors(capsys, args, message):
+    model = load_model("cable_clip")
+    with pytest.raises(SystemExit) as e:
+        main(model.build_part_fns, model.variants, args=args)
+    assert e.value.code == 2
+    assert message in capsys.readouterr().err
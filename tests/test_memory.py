@@ -0,0 +1,25 @@
+import pytest
+
+from cad_models import memory
+from cad_models.memory import MemoryBudgetError, check_memory_budget, memory_watchdog
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(memory, "memory_budget", 64 * 1024 * 1024)
+    monkeypatch.setattr(memory, "memory_baseline", memory.get_rss())
+
+
+def test_memory_budget_ignores_memory_held_before_the_job(budget):
+    check_memory_budget()
+
+
+def test_memory_watchdog_reports_peaks_at_the_next_check(budget):
+    with memory_watchdog(interval=0.01):
+        # stands in for an operation that goes over the budget and back
+        data = b"x" * (128 * 1024 * 1024)
+        while memory.memory_peak < len(data):
+            pass
+        del data
+        with pytest.raises(MemoryBudgetError, match="memory budget exceeded"):
+            check_memory_budget()
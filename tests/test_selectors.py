@@ -0,0 +1,43 @@
+import pytest
+from build123d import *
+
+from cad_models.selectors import select_edges, select_faces
+
+
+def build() -> BuildPart:
+    with BuildPart() as builder:
+        Box(40, 30, 10)
+        Cylinder(4, 10, mode=Mode.SUBTRACT)
+        fillet(builder.edges().filter_by(Axis.Z), 3)
+        # tilted inside and outside the 1e-5 degree tolerance
+        with Locations(Location((60, 0, 0), (5e-6, 0, 0))):
+            Box(10, 10, 10)
+        with Locations(Location((90, 0, 0), (2e-5, 0, 0))):
+            Box(10, 10, 10)
+        # trimmed planar and curved faces
+        with Locations((0, 60, 0)):
+            Cylinder(5, 10)
+            Box(20, 4, 20, mode=Mode.SUBTRACT)
+    return builder
+
+
+def ids(shapes: ShapeList) -> list[int]:
+    return [hash(shape) for shape in shapes]
+
+
+@pytest.mark.parametrize("filter_by", [Axis.X, Axis.Y, Axis.Z])
+@pytest.mark.parametrize("sort_by", [None, Axis.X, Axis.Z])
+def test_select_matches_filter_by(filter_by: Axis, sort_by: Axis | None):
+    builder = build()
+    expected_faces = builder.faces().filter_by(filter_by).sort_by(sort_by or filter_by)
+    expected_edges = builder.edges().filter_by(filter_by).sort_by(sort_by or filter_by)
+    assert ids(select_faces(builder, filter_by, sort_by)) == ids(expected_faces)
+    assert ids(select_edges(builder, filter_by, sort_by)) == ids(expected_edges)
+
+
+def test_select_tolerance_is_in_degrees():
+    builder = build()
+    faces = select_faces(builder, Axis.Z)
+    centers = [round(face.center().X) for face in faces]
+    assert 60 in centers
+    assert 90 not in centers
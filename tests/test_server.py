@@ -0,0 +1,51 @@
+import threading
+import urllib.error
+
+import pytest
+
+from cad_models.server import BuildServer, Client, local_server
+
+
+@pytest.fixture(scope="module")
+def client():
+    with local_server(workers=1, cache=False) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "model, variant, parameters, message",
+    [
+        ("cable_clip", "2-cable", {"clip_height": "abc"}, "must be a float"),
+        ("cable_clip", "2-cable", {"nope": 1}, "invalid parameter: nope"),
+        ("rack_shelf", "hue-bridge", {"mount_thickness": -1}, "mount thickness"),
+        ("rack_shelf", "hue-bridge", {"devices": []}, "can't be overridden"),
+        ("cable_clip", "nope", {}, "invalid variant"),
+    ],
+)
+def test_build_rejects_invalid_requests(client, model, variant, parameters, message):
+    with pytest.raises(ValueError, match=message):
+        client.build(model, variant, parameters)
+
+
+def test_build(client):
+    body = client.build("cable_clip", "2-cable", {"clip_height": 12})
+    assert body.startswith(b"ISO-10303-21;")
+
+
+class FailingService:
+    def build(self, request):
+        raise ValueError("/internal/path")
+
+
+def test_build_errors_are_server_errors():
+    server = BuildServer(("127.0.0.1", 0), FailingService())  # type: ignore
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            Client(server.url).build("cable_clip", "2-cable")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert e.value.code == 500
+    assert e.value.reason == "build failed"
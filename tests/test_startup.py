@@ -0,0 +1,11 @@
+from cad_models.benchmark import measure_startup
+
+# seconds for a fresh interpreter to import cad_models.common - nearly all of it is
+# loading build123d and OCCT, about 3.5s on a laptop
+startup_budget = 6.0
+
+
+def test_import_skips_viewer_within_budget():
+    runs = [measure_startup() for _ in range(2)]
+    assert not any(viewer_imported for _, viewer_imported in runs)
+    assert min(duration for duration, _ in runs) < startup_budget
@@ -0,0 +1,51 @@
+import pytest
+from build123d import *
+
+from cad_models.export import export_shapes
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAD_MODELS_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def create_shapes() -> list[Part]:
+    with BuildPart() as builder:
+        Box(20, 10, 5)
+        Cylinder(3, 5, mode=Mode.SUBTRACT)
+        fillet(builder.edges().filter_by(Axis.Z), 1)
+    part = builder.part
+    return [part, part.moved(Location((30, 5, 0), (0, 0, 30)))]
+
+
+def read_3mf(path) -> list[tuple[float, float, int]]:
+    return [(s.volume, s.area, len(s.faces())) for s in Mesher().read(path)]
+
+
+def test_3mf_export_matches_mesher(tmp_path):
+    shapes = create_shapes()
+    mesher = Mesher()
+    mesher.add_shape(shapes, linear_deflection=0.001, angular_deflection=0.1)
+    mesher.write(tmp_path / "expected.3mf")
+    expected = read_3mf(tmp_path / "expected.3mf")
+    # the first export fills the mesh cache, the second reads from it
+    for name in ["uncached.3mf", "cached.3mf"]:
+        export_shapes(shapes, tmp_path / name)
+        actual = read_3mf(tmp_path / name)
+        assert len(actual) == len(expected)
+        for (volume, area, faces), expected_values in zip(actual, expected):
+            assert (volume, area) == pytest.approx(expected_values[:2], rel=1e-9)
+            assert faces == expected_values[2]
+    assert len(list(tmp_path.joinpath("cache").rglob("*.3mf"))) == 1
+
+
+def test_3mf_export_of_moved_shapes_is_not_cached(tmp_path):
+    shapes = create_shapes()
+    export_shapes(shapes, tmp_path / "before.3mf")
+    moved = [shapes[0], shapes[1].moved(Location((0, 20, 0)))]
+    export_shapes(moved, tmp_path / "after.3mf")
+    assert len(list(tmp_path.joinpath("cache").rglob("*.3mf"))) == 2
+    # 3mf stores single precision coordinates
+    actual = [s.bounding_box().max.Y for s in Mesher().read(tmp_path / "after.3mf")]
+    expected = [s.bounding_box().max.Y for s in moved]
+    assert max(actual) == pytest.approx(max(expected), abs=1e-3)
@@ -0,0 +1,35 @@
+import gc
+import types
+
+from cad_models.common import device_memos, memoize_device
+from cad_models.jobs import reload_model
+
+
+def test_reload_model_drops_device_memos():
+    reload_model("rack_shelf")
+    gc.collect()
+    count = len(device_memos)
+    assert count
+    for _ in range(3):
+        reload_model("rack_shelf")
+    gc.collect()
+    assert len(device_memos) == count
+
+
+class Device:
+    def __init__(self, width: int):
+        self.p = types.SimpleNamespace(devices=[self])
+        self.width = width
+
+
+def test_memoize_device_drops_least_recently_used():
+    calls = []
+
+    def build(device: Device) -> int:
+        calls.append(device.width)
+        return device.width
+
+    tray = memoize_device(build, maxsize=2)
+    for width in [1, 2, 1, 3, 1, 2]:
+        assert tray(Device(width)) == width
+    assert calls == [1, 2, 3, 2]